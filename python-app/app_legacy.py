@@ -1,15 +1,24 @@
 import paho.mqtt.client as mqtt
-import json
+import base64
 import os
+import re
+import socket
 import sys
 import time
 import struct
 import threading
+import queue
+
+try:
+    import orjson as _json
+except ImportError:  # orjson is optional - stdlib json also accepts bytes
+    import json as _json
 
 # --- CONFIGURATION ---
 BROKER_ADDRESS = os.getenv('MQTT_BROKER', '127.0.0.1')
 BROKER_PORT = 1883
 TOPIC = "application/+/device/+/event/up"
+UPLINK_TOPIC = "application/+/device/{dev_eui}/event/up"
 
 # --- SCENARIO: LEASH / ANTI-THEFT ---
 # "Trigger alarm if beacon moves to other floor (moves away)"
@@ -38,19 +47,64 @@ SAFE_RSSI_THRESHOLD = -85
 ALARM_PAYLOAD_HEX = "01" 
 ALARM_FPORT = 2
 
+# MQTT flow control
+MQTT_MAX_INFLIGHT = 200
+MQTT_MAX_QUEUED = 10000
+
+# --- PRECOMPUTED CONSTANTS ---
+# Work that never changes between messages is done once at load time.
+_TRACKED_UPPER = TRACKED_BEACON_ID.upper()
+_b64decode = base64.b64decode
+_BEACON_ID = struct.Struct(">I")  # Big-endian 4-byte beacon ID (Major + Minor)
+_RSSI = struct.Struct("b")        # Signed RSSI byte
+_RSSI_RE = re.compile(r"-?\d+")   # Integer part of "-67dBm" / "-67.5"
+_b64encode = base64.b64encode
+_ALARM_PAYLOAD_B64 = base64.b64encode(bytes.fromhex(ALARM_PAYLOAD_HEX)).decode('utf-8')
+
+# Serialized alarm downlink; "__EUI__" is swapped for the target DevEUI on send.
+_ALARM_ON_TEMPLATE = _json.dumps({
+    "devEui": "__EUI__",
+    "confirmed": False,
+    "fPort": ALARM_FPORT,
+    "data": _ALARM_PAYLOAD_B64
+})
+if isinstance(_ALARM_ON_TEMPLATE, str):
+    _ALARM_ON_TEMPLATE = _ALARM_ON_TEMPLATE.encode('utf-8')
+
 # --- GLOBAL STATE (For Real-Time Dashboard) ---
 last_beacon_stats = {
     "seen": False,
     "rssi": 0,
     "sensor": "",
-    "time": 0,
+    "time": 0,  # time.monotonic() of the last sighting
     "id": ""
 }
 
+# Formatted HH:MM:SS, rebuilt at most once per second
+_ts_cache = [0, ""]
+
+def now_hms():
+    s = int(time.time())
+    if s != _ts_cache[0]:
+        _ts_cache[:] = [s, time.strftime('%H:%M:%S', time.localtime(s))]
+    return _ts_cache[1]
+
+# Set by on_message when the dashboard line would change (RSSI or sensor)
+_state_dirty = threading.Event()
+STATUS_MAX_INTERVAL = 1  # Seconds between dashboard redraws when idle (keeps "Ns ago" ticking)
+
+# Raw uplinks waiting for the worker; on_message only enqueues
+RX_QUEUE_SIZE = 8192
+RX_BATCH_SIZE = 256
+_rx_queue = queue.Queue(maxsize=RX_QUEUE_SIZE)
+
 def on_connect(client, userdata, flags, rc, properties=None):
     if rc == 0:
         print("✅ Connected to MQTT Broker!")
-        client.subscribe(TOPIC)
+        # Send small downlinks immediately instead of waiting on Nagle
+        client.socket().setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # One topic per scanner so the broker filters out unrelated devices
+        client.subscribe([(UPLINK_TOPIC.format(dev_eui=eui), 0) for eui in SCANNERS])
         print(f"   👀 Watching for Beacon [{TRACKED_BEACON_ID}]...")
         print(f"   🏙️  Safe Zone Scanners: {list(SCANNERS.keys())}")
         print(f"   🚨 Alarm Target: {ALARM_TARGET_EUI}")
@@ -66,25 +120,29 @@ def decode_lansitec_hex(hex_string):
     try:
         # Convert hex string to bytes
         data_bytes = bytes.fromhex(hex_string)
-        
-        # Basic Validation (Length must be at least 7 bytes for 1 beacon)
-        if len(data_bytes) < 7:
-            return None
+    except (ValueError, TypeError) as e:
+        print(f"   ⚠️ Decoder Error: {e}")
+        return None
+    return decode_lansitec_bytes(data_bytes)
 
-        # Extract the Beacon ID (Bytes 2,3,4,5)
-        # 001064b0
-        beacon_id_bytes = data_bytes[2:6]
-        beacon_id = beacon_id_bytes.hex()
+def decode_lansitec_bytes(data_bytes):
+    """
+    Decodes a raw Lansitec Macro Sensor frame that is already bytes
+    (e.g. straight from the base64 'data' field, no hex round-trip).
+    """
+    # Basic Validation (Length must be at least 7 bytes for 1 beacon)
+    if len(data_bytes) < 7:
+        return None
 
-        # Extract RSSI (Last Byte)
-        # c4 -> 196.  196 - 256 = -60dBm
-        rssi_byte = data_bytes[-1]
-        rssi = rssi_byte - 256 if rssi_byte > 127 else rssi_byte
+    # Extract the Beacon ID (Bytes 2,3,4,5)
+    # 001064b0
+    beacon_id = f"{_BEACON_ID.unpack_from(data_bytes, 2)[0]:08x}"
 
-        return {"id": beacon_id, "rssi": rssi}
-    except Exception as e:
-        print(f"   ⚠️ Decoder Error: {e}")
-        return None
+    # Extract RSSI (Last Byte, signed)
+    # c4 -> -60dBm
+    rssi = _RSSI.unpack_from(data_bytes, len(data_bytes) - 1)[0]
+
+    return {"id": beacon_id, "rssi": rssi}
 
 def send_downlink(client, application_id, dev_eui, data_hex):
     """
@@ -92,24 +150,26 @@ def send_downlink(client, application_id, dev_eui, data_hex):
     """
     topic = f"application/{application_id}/device/{dev_eui}/command/down"
     
-    # Convert Hex to Base64
-    try:
-        data_bytes = bytes.fromhex(data_hex)
-        import base64
-        data_b64 = base64.b64encode(data_bytes).decode('utf-8')
-    except Exception as e:
-        print(f"❌ Error encoding downlink data: {e}")
-        return
-
-    payload = {
-        "devEui": dev_eui,
-        "confirmed": False,
-        "fPort": ALARM_FPORT,
-        "data": data_b64
-    }
+    if data_hex == ALARM_PAYLOAD_HEX:
+        payload = _ALARM_ON_TEMPLATE.replace(b"__EUI__", dev_eui.encode('utf-8'))
+    else:
+        # Convert Hex to Base64
+        try:
+            data_bytes = bytes.fromhex(data_hex)
+            data_b64 = _b64encode(data_bytes).decode('utf-8')
+        except Exception as e:
+            print(f"❌ Error encoding downlink data: {e}")
+            return
+
+        payload = _json.dumps({
+            "devEui": dev_eui,
+            "confirmed": False,
+            "fPort": ALARM_FPORT,
+            "data": data_b64
+        })
     
     try:
-        client.publish(topic, json.dumps(payload))
+        client.publish(topic, payload)
         print(f"   🚀 ALARM ACTIVATED! Downlink sent to {dev_eui}")
     except Exception as e:
         print(f"❌ Failed to publish downlink: {e}")
@@ -124,8 +184,27 @@ def trigger_alarm(client, app_id):
     send_downlink(client, app_id, ALARM_TARGET_EUI, ALARM_PAYLOAD_HEX)
 
 def on_message(client, userdata, msg):
+    """Hand the raw payload to rx_worker so the network thread never parses."""
     try:
-        payload = json.loads(msg.payload.decode())
+        _rx_queue.put_nowait(msg.payload)
+    except queue.Full:
+        print("⚠️ RX queue full, dropping uplink")
+
+def rx_worker(client):
+    """Drain queued uplinks in batches of up to RX_BATCH_SIZE."""
+    while True:
+        batch = [_rx_queue.get()]
+        while len(batch) < RX_BATCH_SIZE:
+            try:
+                batch.append(_rx_queue.get_nowait())
+            except queue.Empty:
+                break
+        for raw in batch:
+            handle_uplink(client, raw)
+
+def handle_uplink(client, raw):
+    try:
+        payload = _json.loads(raw)
         
         # 1. Get the Sender DevEUI
         if 'deviceInfo' in payload:
@@ -145,27 +224,22 @@ def on_message(client, userdata, msg):
                 if key.startswith("beacon"):
                     idx = key.replace("beacon", "") 
                     rssi_str = obj.get(f"rssi{idx}", "-999dBm")
-                    try:
-                        rssi_val = int(str(rssi_str).replace("dBm", "").split(".")[0])
-                    except:
-                        rssi_val = -999
+                    m = _RSSI_RE.search(str(rssi_str))
+                    rssi_val = int(m.group()) if m else -999
                     decoded_beacons.append({"id": val, "rssi": rssi_val})
 
         # =========================================================
         # STRATEGY 2: If not decoded, try RAW HEX (Manual Decode)
         # =========================================================
         if not decoded_beacons:
-            raw_hex = ""
+            beacon_data = None
             if 'object' in payload and 'raw' in payload['object']:
-                raw_hex = payload['object']['raw']
+                beacon_data = decode_lansitec_hex(payload['object']['raw'])
             elif 'data' in payload:
-                import base64
-                raw_hex = base64.b64decode(payload['data']).hex()
+                beacon_data = decode_lansitec_bytes(_b64decode(payload['data']))
             
-            if raw_hex:
-                beacon_data = decode_lansitec_hex(raw_hex)
-                if beacon_data:
-                    decoded_beacons.append(beacon_data)
+            if beacon_data:
+                decoded_beacons.append(beacon_data)
 
         # =========================================================
         # PROCESS DETECTED BEACONS
@@ -175,13 +249,17 @@ def on_message(client, userdata, msg):
             rssi = beacon['rssi']
             
             # Normalize casing for comparison
-            if str(detected_id).upper() == TRACKED_BEACON_ID.upper():
+            if str(detected_id).upper() == _TRACKED_UPPER:
                 
                 # --- UPDATE DASHBOARD STATS ---
+                if (rssi != last_beacon_stats["rssi"] or
+                        sensor_eui != last_beacon_stats["sensor"] or
+                        not last_beacon_stats["seen"]):
+                    _state_dirty.set()
                 last_beacon_stats["seen"] = True
                 last_beacon_stats["rssi"] = rssi
                 last_beacon_stats["sensor"] = sensor_eui
-                last_beacon_stats["time"] = time.time()
+                last_beacon_stats["time"] = time.monotonic()
                 last_beacon_stats["id"] = detected_id
 
                 # NEW LOGIC: LEASH MODE
@@ -194,7 +272,7 @@ def on_message(client, userdata, msg):
                 status_icon = "✅" if is_safe else "⚠️"
                 status_msg = "SAFE (Nearby)" if is_safe else "WARNING (Moving Away!)"
                 
-                print(f"\r[{time.strftime('%H:%M:%S')}] {status_icon} Signal: {rssi} dBm | {status_msg} | Scanner: {sensor_eui[-4:]}")
+                print(f"\r[{now_hms()}] {status_icon} Signal: {rssi} dBm | {status_msg} | Scanner: {sensor_eui[-4:]}")
 
                 if not is_safe:
                     trigger_alarm(client, app_id)
@@ -206,12 +284,13 @@ def on_message(client, userdata, msg):
 # --- BACKGROUND THREAD FOR "HEARTBEAT" ---
 def print_status_loop():
     """
-    Prints a status update every second.
+    Prints a status update as soon as the beacon stats change,
+    and every STATUS_MAX_INTERVAL seconds otherwise so the "ago" count keeps moving.
     """
     while True:
         # Dynamic Dashboard Line
         if last_beacon_stats["seen"]:
-            diff = int(time.time() - last_beacon_stats["time"])
+            diff = int(time.monotonic() - last_beacon_stats["time"])
             s_id = last_beacon_stats["sensor"][-4:] # Last 4 chars for brevity
             rssi = last_beacon_stats['rssi']
             
@@ -222,12 +301,16 @@ def print_status_loop():
         else:
             msg = "Searching for Signal..."
 
-        sys.stdout.write(f"\r[{time.strftime('%H:%M:%S')}] ⏳ {msg}       ")
+        sys.stdout.write(f"\r[{now_hms()}] ⏳ {msg}       ")
         sys.stdout.flush()
-        time.sleep(1)
+        _state_dirty.wait(timeout=STATUS_MAX_INTERVAL)
+        _state_dirty.clear()
 
 # --- MAIN ---
 client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+client.max_inflight_messages_set(MQTT_MAX_INFLIGHT)
+client.max_queued_messages_set(MQTT_MAX_QUEUED)
+client.reconnect_delay_set(min_delay=1, max_delay=30)
 
 # Start logic
 try:
@@ -241,6 +324,9 @@ try:
     t = threading.Thread(target=print_status_loop, daemon=True)
     t.start()
     
+    # Decode uplinks off the network thread
+    threading.Thread(target=rx_worker, args=(client,), daemon=True).start()
+    
     client.loop_forever()
     
 except Exception as e:
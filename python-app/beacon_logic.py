@@ -1,5 +1,19 @@
+import struct
 import settings
 
+# --- PRECOMPUTED CONSTANTS ---
+# Gateway JSON slot keys: (beaconN, rssiN, beaconN_minor) for N = 1..5
+_BEACON_KEYS = tuple((f"beacon{i}", f"rssi{i}", f"beacon{i}_minor") for i in range(1, 6))
+_TARGET_MAJOR_UPPER = settings.TARGET_MAJOR_VALUE.upper()
+
+# Match tables: full IDs (Major+Minor) and values accepted in `beaconX_minor`
+_WATCH_SET = frozenset({settings.TRACKED_BEACON_ID.upper()})
+_MINOR_MATCHES = frozenset({settings.TARGET_MAJOR_VALUE})
+_SERVICE_UUID = settings.TARGET_SERVICE_UUID.lower()
+_BATTERY_UUID = settings.BATTERY_UUID.lower()
+_BEACON_ID = struct.Struct(">I")  # Big-endian 4-byte beacon ID (Major + Minor)
+_RSSI = struct.Struct("b")        # Signed RSSI byte
+
 def decode_ble_packet(raw_hex):
     """
     Parses standard BLE Advertisement Data (Length-Type-Value).
@@ -7,34 +21,30 @@ def decode_ble_packet(raw_hex):
     """
     try:
         data = bytes.fromhex(raw_hex)
+        size = len(data)
         idx = 0
         result = {"id": None, "battery": None}
 
-        while idx < len(data):
+        # Walk the TLV records by integer index; only matching Service Data
+        # records are sliced and converted to hex.
+        while idx + 1 < size:
             # 1. Read Length
-            if idx >= len(data): break
             length = data[idx]
             if length == 0: break 
             
             # 2. Read Type
-            if idx + 1 >= len(data): break
             ad_type = data[idx+1]
             
-            # 3. Read Content
-            chunk = data[idx+2 : idx+1+length]
-            
-            # CHECK: Service Data (0x16)
-            if ad_type == 0x16 and len(chunk) >= 2:
+            # 3. CHECK: Service Data (0x16) with at least a 2-byte UUID
+            end = min(idx + 1 + length, size)
+            if ad_type == 0x16 and end - (idx + 2) >= 2:
                 # First 2 bytes are UUID (Little Endian)
-                uuid_bytes = chunk[0:2]
-                uuid_hex = uuid_bytes[::-1].hex().lower()
-                value_bytes = chunk[2:]
-                value_hex = value_bytes.hex()
+                uuid_hex = f"{data[idx+3]:02x}{data[idx+2]:02x}"
                 
-                if uuid_hex == settings.TARGET_SERVICE_UUID:
-                    result["id"] = value_hex
-                elif uuid_hex == settings.BATTERY_UUID:
-                    result["battery"] = value_hex
+                if uuid_hex == _SERVICE_UUID:
+                    result["id"] = data[idx+4:end].hex()
+                elif uuid_hex == _BATTERY_UUID:
+                    result["battery"] = data[idx+4:end].hex()
 
             # Advance
             idx += (1 + length)
@@ -51,18 +61,23 @@ def decode_lansitec_hex(hex_string):
     """
     try:
         data_bytes = bytes.fromhex(hex_string)
-        if len(data_bytes) < 7: return None
+    except (ValueError, TypeError):
+        return None
+    return decode_lansitec_bytes(data_bytes)
+
+def decode_lansitec_bytes(data_bytes):
+    """
+    Same as decode_lansitec_hex, for frames that are already bytes.
+    """
+    if len(data_bytes) < 7: return None
 
-        # Extract Beacon ID (Bytes 2-5)
-        beacon_id = data_bytes[2:6].hex()
+    # Extract Beacon ID (Bytes 2-5)
+    beacon_id = f"{_BEACON_ID.unpack_from(data_bytes, 2)[0]:08x}"
 
-        # Extract RSSI (Last Byte)
-        rssi_byte = data_bytes[-1]
-        rssi = rssi_byte - 256 if rssi_byte > 127 else rssi_byte
+    # Extract RSSI (Last Byte, signed)
+    rssi = _RSSI.unpack_from(data_bytes, len(data_bytes) - 1)[0]
 
-        return {"id": beacon_id, "rssi": rssi}
-    except Exception:
-        return None
+    return {"id": beacon_id, "rssi": rssi}
 
 def decode_gateway_json(payload_object):
     """
@@ -78,33 +93,27 @@ def decode_gateway_json(payload_object):
         # or MultiDeviceTypeMessage (Type E)
         
         # We'll just loop up to a reasonable number (e.g., 5) to find matches
-        for i in range(1, 6):
-            beacon_key = f"beacon{i}"
-            rssi_key = f"rssi{i}"
-            minor_key = f"beacon{i}_minor"  # From our modified JS decoder
+        for beacon_key, rssi_key, minor_key in _BEACON_KEYS:
+            beacon_val = payload_object.get(beacon_key) # e.g. "001064B0"
+            if beacon_val is None:
+                continue
             
-            if beacon_key in payload_object:
-                beacon_val = payload_object[beacon_key] # e.g. "001064B0"
-                
-                # Check Match
-                # 1. Match against Full ID (Major+Minor)
-                is_match = (beacon_val == settings.TRACKED_BEACON_ID.upper())
-                
-                # 2. Match against just Minor (if provided in settings or by decoder)
-                # The user's JS decoder now outputs `beaconX_minor`
-                if not is_match and minor_key in payload_object:
-                     minor_val = payload_object[minor_key]
-                     if minor_val == settings.TARGET_MAJOR_VALUE: # TARGET_MAJOR_VALUE is actually used as the ID to match in main.py
-                         is_match = True
-                
-                # 3. Match against Settings "Major" (which effectively acts as an ID)
-                # Note: valid hex strings are case-insensitive
-                if not is_match and settings.TARGET_MAJOR_VALUE and (settings.TARGET_MAJOR_VALUE.upper() in beacon_val):
-                    is_match = True
+            # Note: valid hex strings are case-insensitive
+            beacon_upper = str(beacon_val).upper()
+            
+            # Check Match
+            # 1. Match against Full ID (Major+Minor)
+            # 2. Match against just Minor (if provided in settings or by decoder)
+            #    The user's JS decoder now outputs `beaconX_minor`
+            #    (TARGET_MAJOR_VALUE is actually used as the ID to match in main.py)
+            # 3. Match against Settings "Major" (which effectively acts as an ID)
+            is_match = (beacon_upper in _WATCH_SET or
+                        payload_object.get(minor_key) in _MINOR_MATCHES or
+                        (_TARGET_MAJOR_UPPER and _TARGET_MAJOR_UPPER in beacon_upper))
 
-                if is_match:
-                    rssi = payload_object.get(rssi_key, -999)
-                    return {"id": beacon_val, "rssi": rssi}
+            if is_match:
+                rssi = payload_object.get(rssi_key, -999)
+                return {"id": beacon_val, "rssi": rssi}
                     
         return None
     except Exception as e:
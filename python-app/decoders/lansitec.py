@@ -1,5 +1,3 @@
-import struct
-
 def decode_lansitec_gateway(payload_hex):
     """
     Decodes payload from Lansitec Bluetooth Gateway.
@@ -65,6 +63,10 @@ def decode_lansitec_gateway(payload_hex):
         return {"error": str(e), "raw": payload_hex}
 
 
+# iBeacon type/length marker (0x02 0x15) that follows the Apple ID 4C00
+_IBEACON_PREFIX = b"\x02\x15"
+
+
 def decode_b002_beacon(payload_hex):
     """
     Decodes the raw BLE Ad Data if available.
@@ -79,12 +81,10 @@ def decode_b002_beacon(payload_hex):
     
     try:
         data = bytes.fromhex(payload_hex)
-        hex_str = payload_hex.upper()
-        
-        # Look for iBeacon prefix
-        ibeacon_prefix = "0215" # Apple ID follow 4C00
         
-        idx = hex_str.find(ibeacon_prefix)
+        # Look for iBeacon prefix directly in the raw bytes
+        # (byte-aligned, no uppercase copy of the hex string)
+        idx = data.find(_IBEACON_PREFIX)
         if idx != -1:
              # Aligned generic
              pass
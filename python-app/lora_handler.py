@@ -1,43 +1,103 @@
-import json
 import base64
+import queue
+import threading
 import settings
 
-def send_downlink(client, app_id, dev_eui, hex_cmd):
+try:
+    import orjson as _json
+except ImportError:  # orjson is optional - stdlib json also accepts bytes
+    import json as _json
+
+# --- DOWNLINK QUEUE ---
+# Downlinks are queued here and published by a background flusher thread,
+# so alarm logic running in the MQTT callback never waits on the network.
+DOWNLINK_QUEUE_SIZE = 1024
+DOWNLINK_BATCH_SIZE = 64
+
+_dl_queue = queue.Queue(maxsize=DOWNLINK_QUEUE_SIZE)
+_flusher = None
+_flusher_lock = threading.Lock()
+
+def _flush_downlinks():
     """
-    Sends a downlink command to a device via ChirpStack MQTT.
-    hex_cmd: "01" (Alarm) or "00" (Silence)
+    Drains the downlink queue, publishing up to DOWNLINK_BATCH_SIZE
+    commands back-to-back per wake-up.
     """
-    topic = f"application/{app_id}/device/{dev_eui}/command/down"
-    
-    try:
-        data_bytes = bytes.fromhex(hex_cmd)
-        data_b64 = base64.b64encode(data_bytes).decode('utf-8')
-    except Exception as e:
-        print(f"❌ Encoding Error: {e}")
-        return False
+    while True:
+        batch = [_dl_queue.get()]
+        while len(batch) < DOWNLINK_BATCH_SIZE:
+            try:
+                batch.append(_dl_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        for client, topic, payload in batch:
+            try:
+                client.publish(topic, payload)
+            except Exception as e:
+                print(f"❌ Publish Error: {e}")
 
-    payload = {
+def _ensure_flusher():
+    """Starts the flusher thread on first use."""
+    global _flusher
+    with _flusher_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_downlinks, daemon=True)
+            _flusher.start()
+
+def _serialize_downlink(dev_eui, hex_cmd):
+    """Builds the ChirpStack downlink JSON for a hex command."""
+    data_b64 = base64.b64encode(bytes.fromhex(hex_cmd)).decode('utf-8')
+    return _json.dumps({
         "devEui": dev_eui,
         "confirmed": False,
         "fPort": settings.ALARM_FPORT,
         "data": data_b64
-    }
-    
+    })
+
+# Alarm on/off always go to the same device, so serialize them once
+_ALARM_ON_JSON = _serialize_downlink(settings.ALARM_TARGET_EUI, settings.ALARM_ON_HEX)
+_ALARM_OFF_JSON = _serialize_downlink(settings.ALARM_TARGET_EUI, settings.ALARM_OFF_HEX)
+
+def _enqueue_downlink(client, topic, payload, label):
+    if _flusher is None:
+        _ensure_flusher()
+
     try:
-        client.publish(topic, json.dumps(payload))
+        _dl_queue.put_nowait((client, topic, payload))
         return True
+    except queue.Full:
+        print(f"❌ Downlink queue full, dropping command {label}")
+        return False
+
+def send_downlink(client, app_id, dev_eui, hex_cmd):
+    """
+    Queues a downlink command to a device via ChirpStack MQTT.
+    hex_cmd: "01" (Alarm) or "00" (Silence)
+
+    Returns True once the command is queued (the payload is serialized
+    here so the flusher thread does no JSON work).
+    """
+    topic = f"application/{app_id}/device/{dev_eui}/command/down"
+    
+    try:
+        payload = _serialize_downlink(dev_eui, hex_cmd)
     except Exception as e:
-        print(f"❌ Publish Error: {e}")
+        print(f"❌ Encoding Error: {e}")
         return False
 
+    return _enqueue_downlink(client, topic, payload, f"{hex_cmd} for {dev_eui}")
+
 def trigger_alarm(client, app_id):
     print("\n" + "="*40)
     print("🚨🚨 ALARM TRIGGERED! (Leaving Safe Zone) 🚨🚨")
     print("="*40 + "\n")
-    send_downlink(client, app_id, settings.ALARM_TARGET_EUI, settings.ALARM_ON_HEX)
+    topic = f"application/{app_id}/device/{settings.ALARM_TARGET_EUI}/command/down"
+    _enqueue_downlink(client, topic, _ALARM_ON_JSON, "alarm on")
 
 def silence_alarm(client, app_id):
     print("\n" + "="*40)
     print("✅ SIGNAL RESTORED - SILENCING ALARM")
     print("="*40 + "\n")
-    send_downlink(client, app_id, settings.ALARM_TARGET_EUI, settings.ALARM_OFF_HEX)
+    topic = f"application/{app_id}/device/{settings.ALARM_TARGET_EUI}/command/down"
+    _enqueue_downlink(client, topic, _ALARM_OFF_JSON, "alarm off")
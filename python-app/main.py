@@ -6,8 +6,11 @@ GUI updates in real-time from MQTT data stream.
 """
 
 import tkinter as tk
-import time
-import threading
+import sys
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
 from src.config import settings
 from src.services.mqtt_client import MQTTClient
 from src.services.decoder import decode_uplink, get_watchlist
@@ -15,6 +18,8 @@ from src.logic.alarm_rules import (
     check_alarm_conditions, 
     set_app_id, 
     get_all_beacon_states,
+    consume_state_change,
+    mark_lost_beacons,
     ProximityConfig
 )
 from src.ui.monitor_window import MonitorWindow
@@ -28,6 +33,7 @@ current_app_id = None
 gui_root = None
 window = None
 mqtt_svc = None
+_FIRST_WATCH_ID = None  # Target of the manual alarm button, set from the watchlist
 
 
 # =============================================================================
@@ -57,12 +63,14 @@ def on_mqtt_message(payload):
     
     # 1. Capture Application ID and Gateway EUI
     gateway_eui = None
-    if 'deviceInfo' in payload:
-        new_app_id = payload['deviceInfo']['applicationId']
-        gateway_eui = payload['deviceInfo'].get('devEui')
+    info = payload.get('deviceInfo')
+    if info is not None:
+        # Interned so the steady-state check is an identity compare
+        new_app_id = sys.intern(info['applicationId'])
+        gateway_eui = info.get('devEui')
         
         # Update Application ID if it changes
-        if current_app_id != new_app_id:
+        if current_app_id is not new_app_id:
             current_app_id = new_app_id
             set_app_id(new_app_id)
 
@@ -72,41 +80,55 @@ def on_mqtt_message(payload):
     if beacons:
         # 3. Process each tracked beacon through alarm logic
         for beacon in beacons:
-            minor_id = beacon.get("matched_id") or beacon.get("minor")
-            rssi = beacon.get("rssi", -999)
+            minor_id = beacon.matched_id or beacon.minor
+            rssi = beacon.rssi
             
             if minor_id and rssi > -999:
                 # Check alarm conditions (triggers/silences as needed)
-                check_alarm_conditions(rssi, minor_id, mqtt_svc, gateway_eui)
+                check_alarm_conditions(rssi, minor_id, mqtt_svc, gateway_eui,
+                                       tracked=beacon.tracked)
         
-        # 4. THREAD-SAFE GUI UPDATE using .after()
-        # This schedules the update on the main Tkinter thread
-        if window and gui_root:
-            gui_root.after(0, update_gui_from_states)
+        # 4. GUI refresh happens on the Tk thread in gui_tick(), which
+        #    pushes the table when consume_state_change() reports that
+        #    check_alarm_conditions() changed a beacon's state
 
 
+# Last (rssi, zone, last_seen, location) pushed to the GUI per beacon
+_prev_states = {}
+
 def update_gui_from_states():
     """
-    Update GUI with current beacon states.
-    Called via gui_root.after() for thread safety.
+    Push changed beacon rows to the GUI.
+    Called from the Tk thread (gui_tick) for thread safety.
     """
-    states = get_all_beacon_states()
-    watchlist = get_watchlist()
+    changes = []
+    watchlist = None
     
-    # Convert to list format expected by GUI
-    state_list = []
-    for beacon_id, state_data in states.items():
-        name = watchlist.get(beacon_id, {}).get("name", f"Beacon {beacon_id}")
-        state_list.append({
+    for beacon_id, state_data in get_all_beacon_states().items():
+        row = (
+            state_data.get("rssi", 0),
+            state_data.get("zone", "UNKNOWN"),
+            state_data.get("last_seen", 0),
+            state_data.get("location") or "Unknown"
+        )
+        if _prev_states.get(beacon_id) == row:
+            continue
+        _prev_states[beacon_id] = row
+        
+        if watchlist is None:
+            watchlist = get_watchlist()
+        rssi, zone, last_seen, location = row
+        changes.append({
             "id": beacon_id,
-            "name": name,
-            "rssi": state_data.get("rssi", 0),
-            "state": state_data.get("zone", "UNKNOWN"),
-            "last_seen": state_data.get("last_seen", 0)
+            "name": watchlist.get(beacon_id, {}).get("name", f"Beacon {beacon_id}"),
+            "location": location,
+            "rssi": rssi,
+            "state": zone,
+            "last_seen": last_seen
         })
     
-    if window:
-        window.update_beacon_states(state_list)
+    if window and changes:
+        window.apply_delta(changes)
 
 
 # =============================================================================
@@ -119,24 +141,45 @@ def on_manual_alarm():
     
     print("📢 Manual Alarm Requested")
     if current_app_id:
-        watchlist = get_watchlist()
-        if watchlist:
-            first_beacon = list(watchlist.keys())[0]
-            manual_trigger_alarm(mqtt_svc, first_beacon)
+        if _FIRST_WATCH_ID:
+            manual_trigger_alarm(mqtt_svc, _FIRST_WATCH_ID)
     else:
         print("⚠️ Cannot trigger: No App ID (wait for first uplink)")
 
 
+def on_config_reloaded():
+    """
+    Config was saved: refresh cached watchlist data, subscribe to any new
+    Bluetooth gateway uplinks and resend all rows.
+    """
+    global _FIRST_WATCH_ID
+    _FIRST_WATCH_ID = next(iter(get_watchlist()), None)
+    mqtt_svc.resubscribe()
+    _prev_states.clear()
+
+
 # =============================================================================
-# WATCHDOG LOOP
+# GUI TICK
 # =============================================================================
 
-def watchdog_loop():
-    """Periodically refresh GUI with current states."""
-    while True:
-        time.sleep(5)
-        if window and gui_root:
-            gui_root.after(0, update_gui_from_states)
+GUI_TICK_MS = 1000             # One housekeeping tick per second on the Tk thread
+GUI_MAX_REFRESH_TICKS = 5      # Refresh at least every 5 ticks when idle
+
+def gui_tick(tick=0):
+    """
+    Single periodic GUI task: update MQTT status, mark silent beacons LOST,
+    and refresh the beacon table when state changed or every
+    GUI_MAX_REFRESH_TICKS ticks. The table is not touched while the window
+    is minimized; _prev_states still holds what was last shown, so the
+    refresh on restoring sends everything that changed meanwhile.
+    """
+    window.set_mqtt_connected(mqtt_svc.connected)
+    lost = mark_lost_beacons()
+    if not window.visible:
+        tick = -1  # next tick is 0, so restoring the window forces a refresh
+    elif consume_state_change() or lost or tick % GUI_MAX_REFRESH_TICKS == 0:
+        update_gui_from_states()
+    gui_root.after(GUI_TICK_MS, gui_tick, tick + 1)
 
 
 # =============================================================================
@@ -144,6 +187,17 @@ def watchdog_loop():
 # =============================================================================
 
 if __name__ == "__main__":
+    # force: event_manager already installs a default handler at import
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(message)s", force=True)
+    # Loggers (MQTT thread included) only enqueue records; a listener
+    # thread does the console writes
+    log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    log_listener = QueueListener(log_queue, *root_logger.handlers, respect_handler_level=True)
+    root_logger.handlers = [QueueHandler(log_queue)]
+    log_listener.start()
+    atexit.register(log_listener.stop)
+    
     print("=" * 60)
     print("🔔 Proximity Alarm System")
     print("=" * 60)
@@ -158,6 +212,7 @@ if __name__ == "__main__":
     for bid, info in watchlist.items():
         print(f"   • {bid}: {info.get('name', 'Unknown')}")
     print()
+    _FIRST_WATCH_ID = next(iter(watchlist), None)
     
     # Initialize custom event hooks
     from src.hooks.custom_actions import register_hooks
@@ -169,20 +224,14 @@ if __name__ == "__main__":
     # Initialize GUI
     gui_root = tk.Tk()
     window = MonitorWindow(gui_root, on_manual_alarm, None)
+    # Names may have changed on config save, so resend every beacon on the next refresh
+    window.on_table_reset = on_config_reloaded
 
     # Connect to MQTT broker
     mqtt_svc.connect()
     
-    # Periodically update MQTT status in GUI
-    def check_connection():
-        window.set_mqtt_connected(mqtt_svc.connected)
-        gui_root.after(1000, check_connection)
-    
-    check_connection()
-
-    # Start watchdog thread
-    t = threading.Thread(target=watchdog_loop, daemon=True)
-    t.start()
+    # Start periodic GUI updates (MQTT status + beacon table)
+    gui_tick()
 
     print("🎯 System Ready. Monitoring for beacons...")
     print("=" * 60)
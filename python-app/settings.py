@@ -5,6 +5,10 @@ BROKER_ADDRESS = os.getenv('MQTT_BROKER', 'mosquitto')
 BROKER_PORT = 1883
 TOPIC = "application/+/device/+/event/up"
 
+# --- BEACON MATCHING ---
+TRACKED_BEACON_ID = "001064b0"  # Full beacon ID (Major + Minor)
+TARGET_MAJOR_VALUE = "0010"     # Beacon Major, also accepted as an ID match
+TARGET_SERVICE_UUID = "fff6"    # BLE Service Data UUID carrying the beacon ID
 BATTERY_UUID = "ff0d"
 
 # --- SCANNERS & CLOUD ---
@@ -15,6 +19,7 @@ SCANNERS = {
 
 # --- ALARM# Default Target Device
 DEFAULT_MACRO_SENSOR_EUI = "70b3d5a4d31205cf" # Device that rings
+ALARM_TARGET_EUI = DEFAULT_MACRO_SENSOR_EUI
 ALARM_FPORT = 2
 ALARM_ON_HEX = "01"
 ALARM_OFF_HEX = "00"
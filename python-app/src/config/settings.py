@@ -1,11 +1,33 @@
 import os
 import json
+import functools
+
+try:
+    import orjson as _json
+except ImportError:  # orjson is optional - stdlib json also accepts bytes
+    import json as _json
 
 # --- MQTT CONNECTION ---
 BROKER_ADDRESS = os.getenv('MQTT_BROKER', '127.0.0.1')
 BROKER_PORT = 1883
 TOPIC = "application/+/device/+/event/up"
 
+# Subscribe per known device instead of the TOPIC wildcard, so the broker
+# drops uplinks from unrelated devices/applications before they reach Python
+SUBSCRIBE_PER_DEVICE = True
+UPLINK_TOPIC_TEMPLATE = "application/+/device/{dev_eui}/event/up"
+
+# Optional MQTT shared-subscription group (e.g. "alarm"): several app
+# instances subscribed with the same group split the uplinks between them
+MQTT_SHARED_GROUP = os.getenv('MQTT_SHARED_GROUP', '')
+
+# Client flow control: allow more QoS>0 messages in flight, bound the
+# outgoing queue so publish() never grows memory without limit
+MQTT_MAX_INFLIGHT = 200
+MQTT_MAX_QUEUED = 10000
+MQTT_RECONNECT_MIN_DELAY = 1   # Seconds
+MQTT_RECONNECT_MAX_DELAY = 30  # Seconds
+
 # --- BEACON WATCHLIST ---
 # List of beacon Minor IDs to track (matched against payload data)
 TARGET_BEACONS = ["64B0", "64AF", "64AE"]  # Default fallback if beacons.json not found
@@ -48,22 +70,49 @@ GUI_TIMEOUT_SECONDS = 120   # GUI: Grace period to keep "Safe Zone" on screen
 # Example: "http://thingsboard.local/api/v1/telemetry"
 DASHBOARD_WEBHOOK_URL = os.getenv('DASHBOARD_URL', "https://asset.propkita.com/admin/tracking-logs")
 
+# --- LOGGING ---
+# Per-uplink decision details are logged at DEBUG; set LOG_LEVEL=DEBUG to see them
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+
+
+# --- FILE CACHE HELPERS ---
+def _file_key(path):
+    """
+    Returns a cache key that changes whenever the file is modified.
+    
+    Returns:
+        tuple: (mtime_ns, size), or None if the file does not exist
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
 
 # --- WATCHLIST LOADER ---
 def load_watchlist():
     """
     Loads beacon watchlist from beacons.json if exists, otherwise uses TARGET_BEACONS.
+    The parsed file is cached until beacons.json changes on disk.
     
     Returns:
         dict: {beacon_id: {"name": "...", "id": "..."}, ...}
     """
+    # Return a copy so callers (e.g. auto-discovery) can't mutate the cache
+    return dict(_load_watchlist_cached(_file_key(WATCHLIST_FILE)))
+
+
+@functools.lru_cache(maxsize=1)
+def _load_watchlist_cached(file_key):
+    """Parses the watchlist. Keyed by _file_key(WATCHLIST_FILE)."""
     watchlist = {}
     
     # Try external JSON file first
-    if os.path.exists(WATCHLIST_FILE):
+    if file_key is not None:
         try:
-            with open(WATCHLIST_FILE, 'r') as f:
-                data = json.load(f)
+            with open(WATCHLIST_FILE, 'rb') as f:
+                data = _json.loads(f.read())
                 for beacon in data.get("beacons", []):
                     bid = beacon.get("id", "").upper()
                     if bid:
@@ -96,6 +145,8 @@ DEVICES_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__fi
 def load_devices():
     """
     Load device configuration from devices.json.
+    The parsed file is cached until devices.json changes on disk,
+    so callers must treat the returned dict as read-only.
     
     Returns:
         dict: {
@@ -103,6 +154,12 @@ def load_devices():
             "beacons": [...]
         }
     """
+    return _load_devices_cached(_file_key(DEVICES_FILE))
+
+
+@functools.lru_cache(maxsize=1)
+def _load_devices_cached(file_key):
+    """Parses devices.json. Keyed by _file_key(DEVICES_FILE)."""
     default_config = {
         "floors": [{
             "id": "floor_1",
@@ -114,7 +171,7 @@ def load_devices():
         "beacons": []
     }
     
-    if os.path.exists(DEVICES_FILE):
+    if file_key is not None:
         try:
             with open(DEVICES_FILE, 'r') as f:
                 data = json.load(f)
@@ -127,6 +184,45 @@ def load_devices():
     return default_config
 
 
+@functools.lru_cache(maxsize=1)
+def _floors_by_device(file_key):
+    """
+    Builds a {device_eui_lower: floor} index from the cached devices.json.
+    Keyed by _file_key(DEVICES_FILE).
+    """
+    index = {}
+    for floor in _load_devices_cached(file_key).get("floors", []):
+        for field in ("macro_sensor_eui", "bluetooth_gateway_eui"):
+            eui = floor.get(field, "").lower()
+            if eui:
+                index.setdefault(eui, floor)
+    return index
+
+
+@functools.lru_cache(maxsize=1)
+def _floors_by_id(file_key):
+    """
+    Builds a {floor_id: floor} index from the cached devices.json.
+    Keyed by _file_key(DEVICES_FILE).
+    """
+    index = {}
+    for floor in _load_devices_cached(file_key).get("floors", []):
+        index.setdefault(floor.get("id"), floor)
+    return index
+
+
+@functools.lru_cache(maxsize=1)
+def _home_floors_by_beacon(file_key):
+    """
+    Builds a {beacon_id_upper: home_floor_id} index from the cached devices.json.
+    Keyed by _file_key(DEVICES_FILE).
+    """
+    index = {}
+    for beacon in _load_devices_cached(file_key).get("beacons", []):
+        index.setdefault(beacon.get("id", "").upper(), beacon.get("home_floor_id"))
+    return index
+
+
 def save_devices(config_data):
     """
     Save device configuration to devices.json.
@@ -157,15 +253,41 @@ def get_floor_by_device(device_eui):
     Returns:
         dict: Floor configuration or None
     """
-    config = load_devices()
-    device_eui = device_eui.lower().strip()
+    index = _floors_by_device(_file_key(DEVICES_FILE))
+    return index.get(device_eui.lower().strip())
+
+
+def get_home_floor_for_beacon(beacon_id):
+    """
+    Find the home floor assigned to a beacon.
     
-    for floor in config.get("floors", []):
-        if (floor.get("macro_sensor_eui", "").lower() == device_eui or
-            floor.get("bluetooth_gateway_eui", "").lower() == device_eui):
-            return floor
+    Args:
+        beacon_id: Beacon Minor ID (e.g., "64B0")
     
-    return None
+    Returns:
+        str: Home floor ID, or "UNKNOWN" if the beacon is not configured
+    """
+    index = _home_floors_by_beacon(_file_key(DEVICES_FILE))
+    return index.get(beacon_id.upper(), "UNKNOWN")
+
+
+def is_configured_beacon(beacon_id):
+    """
+    Check whether a beacon is listed in devices.json or the watchlist file.
+    
+    Beacons added at runtime by auto-discovery are in neither; the decoder
+    reports those as tracked instead.
+    
+    Args:
+        beacon_id: Beacon Minor ID (e.g., "64B0")
+    
+    Returns:
+        bool: True if either file has an entry for the beacon
+    """
+    bid = beacon_id.upper()
+    if bid in _home_floors_by_beacon(_file_key(DEVICES_FILE)):
+        return True
+    return bid in _load_watchlist_cached(_file_key(WATCHLIST_FILE))
 
 
 def get_macro_sensor_for_floor(floor_id):
@@ -178,11 +300,36 @@ def get_macro_sensor_for_floor(floor_id):
     Returns:
         str: Macro sensor DevEUI or default
     """
-    config = load_devices()
+    floor = _floors_by_id(_file_key(DEVICES_FILE)).get(floor_id)
+    if floor is None:
+        return ALARM_TARGET_EUI
+    return floor.get("macro_sensor_eui", ALARM_TARGET_EUI)
+
+
+def get_uplink_subscriptions():
+    """
+    Build the MQTT subscription list for uplinks.
     
-    for floor in config.get("floors", []):
-        if floor.get("id") == floor_id:
-            return floor.get("macro_sensor_eui", ALARM_TARGET_EUI)
+    Uses one topic per known device (SCANNERS plus the Bluetooth gateways
+    in devices.json) when SUBSCRIBE_PER_DEVICE is enabled, otherwise the
+    TOPIC wildcard.
     
-    return ALARM_TARGET_EUI
-
+    Returns:
+        list: [(topic, qos), ...] suitable for client.subscribe()
+    """
+    topics = []
+    if SUBSCRIBE_PER_DEVICE:
+        euis = {eui.lower() for eui in SCANNERS}
+        for floor in load_devices().get("floors", []):
+            eui = floor.get("bluetooth_gateway_eui", "").lower().strip()
+            if eui:
+                euis.add(eui)
+        topics = [UPLINK_TOPIC_TEMPLATE.format(dev_eui=eui) for eui in sorted(euis)]
+    
+    if not topics:
+        topics = [TOPIC]
+    
+    if MQTT_SHARED_GROUP:
+        topics = [f"$share/{MQTT_SHARED_GROUP}/{topic}" for topic in topics]
+    
+    return [(topic, 0) for topic in topics]
@@ -6,14 +6,46 @@ It subscribes these functions to the EventManager.
 """
 
 import time
-import json
 import logging
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from src.services.event_manager import EventManager
 from src.config.settings import DASHBOARD_WEBHOOK_URL
 
+try:
+    import orjson as _json
+except ImportError:  # orjson is optional - stdlib dumps is ASCII-safe for the body
+    import json as _json
+
 logger = logging.getLogger(__name__)
 
+# Webhook POSTs run on one worker thread with a keep-alive session, so the
+# MQTT thread that raised the event never waits on the dashboard. A single
+# worker keeps the posts in event order (e.g. SAFE->ALARM before ALARM->SAFE).
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+_webhook_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="webhook")
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_hooks_registered = False
+
+
+def _post_webhook(payload):
+    """Send one status update to the dashboard (runs on the webhook thread)."""
+    try:
+        response = _session.post(DASHBOARD_WEBHOOK_URL, data=_json.dumps(payload),
+                                 headers=_JSON_HEADERS, timeout=2)
+        
+        if response.status_code == 200:
+            print(f"[WEBHOOK] ✅ Sent to dashboard: {response.status_code}")
+        else:
+            print(f"[WEBHOOK] ⚠️ Failed: {response.status_code} - {response.text}")
+            
+    except Exception as e:
+        print(f"[WEBHOOK] ❌ Error sending data: {e}")
+
+
 def on_beacon_status_change(data):
     """
     Custom function called when a beacon's status changes.
@@ -33,28 +65,16 @@ def on_beacon_status_change(data):
     # DASHBOARD LOGGING (HTTP Webhook)
     # ---------------------------------------------------------
     if DASHBOARD_WEBHOOK_URL:
-        try:
-            payload = {
-                "device_id": beacon_id,
-                "status": new_state,
-                "rssi": rssi,
-                "old_status": old_state,
-                "timestamp": int(timestamp * 1000), # Milliseconds
-                "location": data.get("location", "Unknown"), # Ensure location is passed in event
-                "message": f"Beacon {beacon_id} is now {new_state}"
-            }
-            
-            # Send async or with short timeout to avoid blocking main thread
-            # For simplicity in this threaded callback, a short timeout is fine
-            response = requests.post(DASHBOARD_WEBHOOK_URL, json=payload, timeout=2)
-            
-            if response.status_code == 200:
-                print(f"[WEBHOOK] ✅ Sent to dashboard: {response.status_code}")
-            else:
-                print(f"[WEBHOOK] ⚠️ Failed: {response.status_code} - {response.text}")
-                
-        except Exception as e:
-            print(f"[WEBHOOK] ❌ Error sending data: {e}")
+        payload = {
+            "device_id": beacon_id,
+            "status": new_state,
+            "rssi": rssi,
+            "old_status": old_state,
+            "timestamp": int(timestamp * 1000), # Milliseconds
+            "location": data.get("location", "Unknown"), # Ensure location is passed in event
+            "message": f"Beacon {beacon_id} is now {new_state}"
+        }
+        _webhook_executor.submit(_post_webhook, payload)
     else:
         print("[WEBHOOK] ℹ️ skipped (DASHBOARD_WEBHOOK_URL not set)")
 
@@ -69,6 +89,11 @@ def on_beacon_status_change(data):
 def register_hooks():
     """
     Register all custom hooks with the EventManager.
+    Safe to call more than once; hooks are only subscribed the first time.
     """
+    global _hooks_registered
+    if _hooks_registered:
+        return
     EventManager.subscribe("beacon_state_change", on_beacon_status_change)
+    _hooks_registered = True
     logger.info("Custom hooks registered.")
@@ -15,19 +15,33 @@ Date: 2026-01-07
 """
 
 import time
-import json
-import base64
-from dataclasses import dataclass
-from typing import Optional, Dict, Any
+import sched
+import heapq
+import functools
+import itertools
+import logging
+import sys
+import threading
+import types
+from binascii import b2a_base64, unhexlify
+from dataclasses import dataclass, fields
+from typing import Optional, Dict, Any, Mapping, List, Tuple
 from enum import Enum
+from paho.mqtt.client import MQTT_ERR_SUCCESS
 from src.services.event_manager import EventManager
 from src.config.settings import (
     SAFE_RSSI_THRESHOLD, 
-    load_devices, 
     get_floor_by_device, 
-    get_macro_sensor_for_floor
+    get_home_floor_for_beacon, 
+    get_macro_sensor_for_floor,
+    is_configured_beacon
 )
 
+logger = logging.getLogger(__name__)
+
+# Debounce timing uses the monotonic clock so wall-clock jumps can't skew it
+_now = time.monotonic
+
 
 # =============================================================================
 # CONFIGURATION
@@ -73,6 +87,13 @@ class ProximityConfig:
     # Debounce - weak signal must persist this long before alarm
     DEBOUNCE_SECONDS = 5
     
+    # State-change events for one beacon closer together than this are
+    # coalesced into a single event (stops SAFE<->ALARM flapping floods)
+    EVENT_MIN_INTERVAL = 0.25  # seconds
+    
+    # Beacons with no uplink for this long are shown as LOST in the GUI
+    LOST_TIMEOUT = 60  # seconds
+    
     # Hex Commands (based on Lansitec documentation)
     # Type 0xB (Alarm Config): B0 + MSGID + ParamType + Value
     CMD_VOLUME_HIGH = "B0000104"   # Set buzzer volume to 4 (loudest)
@@ -81,26 +102,72 @@ class ProximityConfig:
     CMD_TRIGGER_BASE = "AC"         # Beacon search command prefix (Type 0xA, Cmd 0xC)
 
 
-class SecurityZone(Enum):
+# Base64 of the fixed commands never changes, so encode them once
+_PRECOMPUTED_B64 = {
+    h: b2a_base64(unhexlify(h), newline=False)
+    for h in (ProximityConfig.CMD_VOLUME_HIGH,
+              ProximityConfig.CMD_VOLUME_MUTE,
+              ProximityConfig.CMD_DURATION)
+}
+
+# ChirpStack downlink JSON (same layout json.dumps produces); paho sends bytes as-is
+_DOWNLINK_TEMPLATE = b'{"devEui": "%s", "confirmed": false, "fPort": %d, "data": "%s"}'
+
+
+class SecurityZone(str, Enum):
     SAFE = "SAFE"
     WEAK = "WEAK"
     ALARM = "ALARM"
 
 
+# Zone strings as stored on BeaconState and sent to events/GUI; plain str
+# compares are cheaper than Enum member lookups on the per-uplink path
+_ZONE_SAFE = SecurityZone.SAFE.value
+_ZONE_WEAK = SecurityZone.WEAK.value
+_ZONE_ALARM = SecurityZone.ALARM.value
+_ZONE_LOST = "LOST"  # View-only status, see mark_lost_beacons()
+
+
 # Alias for compatibility
 # ProximityConfig = SafeZoneConfig # This line is now redundant as SafeZoneConfig is renamed
 
 
-@dataclass
+def _slotted(cls):
+    """Give a dataclass __slots__ before 3.10, which lacks dataclass(slots=True)."""
+    if "__slots__" in cls.__dict__:
+        return cls
+    names = tuple(f.name for f in fields(cls))
+    ns = {k: v for k, v in cls.__dict__.items() if k not in names}
+    ns.pop("__dict__", None)
+    ns.pop("__weakref__", None)
+    ns["__slots__"] = names
+    return type(cls)(cls.__name__, cls.__bases__, ns)
+
+
+if sys.version_info >= (3, 10):
+    _slotted_dataclass = dataclass(slots=True)
+else:
+    def _slotted_dataclass(cls):
+        return _slotted(dataclass(cls))
+
+
+# BeaconState.safe_floor until an uplink has been fully evaluated as SAFE
+_NOT_SAFE = object()
+
+
+@_slotted_dataclass
 class BeaconState:
     beacon_id: str
-    zone: Optional[SecurityZone] = None
+    zone: Optional[str] = None  # One of the _ZONE_* strings
     last_rssi: int = -999
-    last_seen: float = 0
-    weak_start: Optional[float] = None
+    last_seen: float = 0  # time.monotonic() of the last uplink
+    weak_start: Optional[float] = None  # time.monotonic() when the beacon left SAFE
     alarm_active: bool = False
     initialized: bool = False
     current_location: str = "Unknown"
+    safe_floor: Any = _NOT_SAFE  # Detection floor of the last full SAFE evaluation
+    last_emit: float = 0  # time.monotonic() of the last state-change event
+    pending_emit: Optional[dict] = None  # Coalesced event waiting for the quiet window
 
 
 # =============================================================================
@@ -108,41 +175,248 @@ class BeaconState:
 # =============================================================================
 
 _beacon_states: Dict[str, BeaconState] = {}
-_msg_id_counter = 0
+
+# GUI-facing snapshot of each beacon, refreshed by _touch_view() whenever
+# check_alarm_conditions() updates a state. Adding a beacon swaps in a new
+# dict, so a reader iterating an older snapshot never sees it resize.
+_beacon_states_view: Dict[str, Dict[str, Any]] = {}
+
+# (last_seen, beacon_id) pushed on every uplink - a min-heap, so the oldest
+# sighting is always first. Entries superseded by a newer uplink are
+# skipped when popped.
+_seen_heap: List[Tuple[float, str]] = []
+_seen_lock = threading.Lock()
+# Search-command MsgIDs; next() on a count is atomic, so manual (GUI thread)
+# and automatic (MQTT thread) triggers never hand out the same ID
+_msg_ids = itertools.count()
+
+# "AC" + MsgID hex + Major for every MsgID, so a search command is one concat
+_MSGID_HEX = tuple(f"{i:02X}" for i in range(256))
+_SEARCH_PREFIX = tuple(
+    ProximityConfig.CMD_TRIGGER_BASE + h + ProximityConfig.BEACON_MAJOR for h in _MSGID_HEX
+)
 _app_id: Optional[str] = None
 
+# Set whenever a beacon's RSSI, zone or location changes (drives GUI refresh)
+_state_dirty = threading.Event()
+
+# Timed downlink steps (e.g. the alarm sequence) and coalesced state-change
+# events run on one background thread, so the MQTT callback never sleeps.
+_scheduler_wakeup = threading.Event()
+_scheduler_thread: Optional[threading.Thread] = None
+_scheduler_lock = threading.Lock()
+
+
+def _scheduler_delay(seconds: float):
+    # Returns early when a new step is scheduled; sched re-checks its queue
+    _scheduler_wakeup.wait(seconds)
+    _scheduler_wakeup.clear()
+
+
+_downlink_scheduler = sched.scheduler(time.monotonic, _scheduler_delay)
+
 
 def set_app_id(app_id: str):
     global _app_id
     _app_id = app_id
 
 
+def _run_downlink_scheduler():
+    while True:
+        _downlink_scheduler.run()
+        # Idle until something new is scheduled
+        _scheduler_wakeup.wait()
+        _scheduler_wakeup.clear()
+
+
+def _schedule_downlink_at(at: float, func, *args):
+    """Run func(*args) at monotonic time `at` on the downlink scheduler thread."""
+    global _scheduler_thread
+    with _scheduler_lock:
+        if _scheduler_thread is None:
+            _scheduler_thread = threading.Thread(target=_run_downlink_scheduler, daemon=True)
+            _scheduler_thread.start()
+    _downlink_scheduler.enterabs(at, 1, func, args)
+    _scheduler_wakeup.set()
+
+
+def _schedule_downlink_step(delay: float, func, *args):
+    """Run func(*args) after delay seconds on the downlink scheduler thread."""
+    _schedule_downlink_at(_now() + delay, func, *args)
+
+
+# Per-sensor pacing: the earliest monotonic time the next downlink may go
+# to each sensor. Keeps every command to one device in order and at least
+# COMMAND_DELAY apart (e.g. a MUTE can't land in the middle of an alarm
+# sequence and then be overridden by its VOLUME step).
+_sensor_next_slot: Dict[str, float] = {}
+# Last command queued to each sensor, i.e. the state it will end up in once
+# its pending downlinks are sent (cleared if a publish fails)
+_last_cmd_by_sensor: Dict[str, str] = {}
+_pacing_lock = threading.Lock()
+
+
+def _reserve_downlink_slot(sensor_eui: str, hex_cmd: str) -> float:
+    now = _now()
+    with _pacing_lock:
+        at = max(now, _sensor_next_slot.get(sensor_eui, 0))
+        _sensor_next_slot[sensor_eui] = at + ProximityConfig.COMMAND_DELAY
+        _last_cmd_by_sensor[sensor_eui] = hex_cmd
+    return at
+
+
+def _send_paced(mqtt_client: Any, sensor_eui: str, hex_cmd: str, cmd_name: str,
+                qos: int = 0) -> Optional[bool]:
+    """
+    Send now if the sensor is idle, otherwise queue behind its pending downlinks.
+    
+    Returns:
+        True if published, False if the publish failed, or None if the
+        command was queued; a queued send that later fails is logged by
+        the scheduler thread.
+    """
+    at = _reserve_downlink_slot(sensor_eui or ProximityConfig.MACRO_SENSOR_EUI, hex_cmd)
+    if at <= _now():
+        return _send_downlink_to_device(mqtt_client, sensor_eui, hex_cmd, cmd_name, qos)
+    _schedule_downlink_at(at, _send_deferred, mqtt_client, sensor_eui, hex_cmd, cmd_name, qos)
+    return None
+
+
+def _send_deferred(mqtt_client: Any, sensor_eui: str, hex_cmd: str, cmd_name: str, qos: int):
+    """Scheduler-thread send for _send_paced; nobody is waiting on its result."""
+    if not _send_downlink_to_device(mqtt_client, sensor_eui, hex_cmd, cmd_name, qos):
+        logger.error("   ❌ Queued %s to %s failed; it was reported as pending",
+                     cmd_name, sensor_eui or ProximityConfig.MACRO_SENSOR_EUI)
+
+
+@functools.lru_cache(maxsize=256)
+def _norm_minor(minor_id: str) -> str:
+    """Uppercase, 4-char Minor ID (memoized - the set of IDs is small)."""
+    return minor_id.upper().zfill(4)
+
+
+_emit_lock = threading.Lock()
+
+
+def _emit_state_change(state: BeaconState, event: dict, now: float):
+    """
+    Emit a beacon_state_change event, at most once per EVENT_MIN_INTERVAL
+    per beacon. Changes inside the window are merged (first old_state,
+    latest new_state) and emitted when the window ends.
+    """
+    with _emit_lock:
+        if state.pending_emit is None:
+            wait = state.last_emit + ProximityConfig.EVENT_MIN_INTERVAL - now
+            if wait <= 0:
+                state.last_emit = now
+            else:
+                state.pending_emit = event
+                _schedule_downlink_step(wait, _flush_state_change, state)
+                return
+        else:
+            state.pending_emit = {**event, "old_state": state.pending_emit["old_state"]}
+            return
+    EventManager.emit("beacon_state_change", event)
+
+
+def _flush_state_change(state: BeaconState):
+    """Emit a coalesced event (runs on the scheduler thread)."""
+    with _emit_lock:
+        event = state.pending_emit
+        state.pending_emit = None
+        state.last_emit = _now()
+    # Flapped back to where it started: nothing to report
+    if event and event["old_state"] != event["new_state"]:
+        EventManager.emit("beacon_state_change", event)
+
+
 def get_beacon_state(beacon_id: str) -> BeaconState:
     if beacon_id not in _beacon_states:
         _beacon_states[beacon_id] = BeaconState(beacon_id=beacon_id)
     return _beacon_states[beacon_id]
 
 
-def get_all_beacon_states() -> Dict[str, Dict]:
-    return {
-        bid: {
-            "id": state.beacon_id,
-            "zone": state.zone.value if state.zone else "UNKNOWN",
-            "state": state.zone.value if state.zone else "UNKNOWN",
-            "rssi": state.last_rssi,
-            "last_seen": state.last_seen,
-            "alarm_active": state.alarm_active,
-            "location": state.current_location
-        }
-        for bid, state in _beacon_states.items()
+def consume_state_change() -> bool:
+    """
+    Check and reset the state-change flag without blocking.
+    
+    Returns:
+        bool: True if a beacon's RSSI, zone or location changed since the last call
+    """
+    if _state_dirty.is_set():
+        _state_dirty.clear()
+        return True
+    return False
+
+
+def _touch_view(state: BeaconState):
+    global _beacon_states_view
+    zone = state.zone or "UNKNOWN"
+    # The GUI shows last_seen as a time of day, so convert it to wall clock
+    last_seen = time.time() - (_now() - state.last_seen) if state.last_seen else 0
+    entry = {
+        "id": state.beacon_id,
+        "zone": zone,
+        "state": zone,
+        "rssi": state.last_rssi,
+        "last_seen": last_seen,
+        "alarm_active": state.alarm_active,
+        "location": state.current_location
     }
+    if state.beacon_id in _beacon_states_view:
+        _beacon_states_view[state.beacon_id] = entry
+    else:
+        _beacon_states_view = {**_beacon_states_view, state.beacon_id: entry}
+
+
+def _record_seen(state: BeaconState, now: float):
+    with _seen_lock:
+        state.last_seen = now
+        heapq.heappush(_seen_heap, (now, state.beacon_id))
+        # Compact when superseded entries pile up (e.g. nobody is sweeping)
+        if len(_seen_heap) > 4 * len(_beacon_states) + 64:
+            _seen_heap[:] = [(s.last_seen, b) for b, s in _beacon_states.items()]
+            heapq.heapify(_seen_heap)
+
+
+def mark_lost_beacons() -> bool:
+    """
+    Show beacons with no uplink for LOST_TIMEOUT seconds as LOST.
+    
+    Pops expired entries off the time-ordered heap, so the cost follows the
+    number of expirations rather than the number of tracked beacons. The
+    beacon's next uplink refreshes its view entry as usual.
+    
+    Returns:
+        bool: True if any beacon was newly marked LOST
+    """
+    cutoff = _now() - ProximityConfig.LOST_TIMEOUT
+    changed = False
+    with _seen_lock:
+        while _seen_heap and _seen_heap[0][0] < cutoff:
+            seen, beacon_id = heapq.heappop(_seen_heap)
+            state = _beacon_states.get(beacon_id)
+            if state is None or state.last_seen != seen:
+                continue  # Superseded by a newer uplink
+            entry = _beacon_states_view.get(beacon_id)
+            if entry is not None and entry["zone"] != _ZONE_LOST:
+                _beacon_states_view[beacon_id] = {**entry, "zone": _ZONE_LOST, "state": _ZONE_LOST}
+                changed = True
+    return changed
+
+
+def get_all_beacon_states() -> Mapping[str, Dict]:
+    """Read-only view of every beacon's latest state (no copy per call)."""
+    return types.MappingProxyType(_beacon_states_view)
 
 
 # =============================================================================
 # MAIN FUNCTION - SAFE ZONE LOGIC
 # =============================================================================
 
-def check_alarm_conditions(rssi: int, minor_id: str, mqtt_client: Any, gateway_eui: str = None) -> str:
+def check_alarm_conditions(rssi: int, minor_id: str, mqtt_client: Any,
+                           gateway_eui: str = None,
+                           tracked: bool = False) -> Optional[SecurityZone]:
     """
     Check alarm conditions based on location (Cross-Level Detection).
     
@@ -151,13 +425,36 @@ def check_alarm_conditions(rssi: int, minor_id: str, mqtt_client: Any, gateway_e
         2. Identify Beacon Home Floor using 'minor_id' (from devices.json)
         3. If Detection Floor == Home Floor -> SAFE (Silence)
         4. If Detection Floor != Home Floor -> ALARM (Buzz Macro Sensor on Detection Floor)
+    
+    Args:
+        rssi: Signal strength in dBm
+        minor_id: Beacon Minor ID (any case)
+        mqtt_client: MQTT client for alarm downlinks
+        gateway_eui: DevEUI of the gateway that reported the beacon
+        tracked: The decoder matched the beacon against its watchlist
+            (Beacon.tracked), which includes auto-discovered beacons
+    
+    Returns:
+        SecurityZone: The beacon's zone after this reading, or None if the
+        beacon is not tracked (tracked is False and it is in neither
+        devices.json nor the watchlist file)
     """
     global _app_id
     
-    minor_id = minor_id.upper().zfill(4)
+    # Config values read once per call (ProximityConfig may be changed at runtime)
+    rssi_threshold = ProximityConfig.RSSI_THRESHOLD
+    debounce_seconds = ProximityConfig.DEBOUNCE_SECONDS
+    
+    minor_id = _norm_minor(minor_id)
+    if not tracked and not is_configured_beacon(minor_id):
+        return None
+    
+    now = _now()
     state = get_beacon_state(minor_id)
+    if rssi != state.last_rssi:
+        _state_dirty.set()
     state.last_rssi = rssi
-    state.last_seen = time.time()
+    _record_seen(state, now)
     
     # Capture old state for event detection
     old_zone = state.zone
@@ -165,27 +462,30 @@ def check_alarm_conditions(rssi: int, minor_id: str, mqtt_client: Any, gateway_e
     # ---------------------------------------------------------
     # LOCATION-BASED LOGIC
     # ---------------------------------------------------------
-    devices_config = load_devices()
-    
     # 1. Find Detection Floor
     detection_floor = None
     if gateway_eui:
         detection_floor = get_floor_by_device(gateway_eui)
+    
+    # Fast path: still SAFE on the same floor object (a devices.json reload
+    # creates new floor dicts, so config changes always take the full path)
+    if (state.zone == _ZONE_SAFE and not state.alarm_active and state.initialized
+            and rssi >= rssi_threshold and detection_floor is state.safe_floor):
+        _touch_view(state)
+        return SecurityZone.SAFE
         
     detection_floor_id = detection_floor.get("id") if detection_floor else "UNKNOWN"
     detection_floor_name = detection_floor.get("name", "Unknown Floor") if detection_floor else "Unknown Floor"
     
     # Update Location State
+    if detection_floor_name != state.current_location:
+        _state_dirty.set()
     state.current_location = detection_floor_name
 
     # 2. Find Beacon Home Floor
-    home_floor_id = "UNKNOWN"
-    for b in devices_config.get("beacons", []):
-        if b.get("id", "").upper() == minor_id:
-            home_floor_id = b.get("home_floor_id")
-            break
+    home_floor_id = get_home_floor_for_beacon(minor_id)
             
-    print(f"📍 Beacon {minor_id} | RSSI {rssi} dBm | G/W: {gateway_eui} ({detection_floor_name})")
+    logger.debug("📍 Beacon %s | RSSI %d dBm | G/W: %s (%s)", minor_id, rssi, gateway_eui, detection_floor_name)
     
     # ---------------------------------------------------------
     # DETERMINE SAFE VS ALARM
@@ -197,26 +497,26 @@ def check_alarm_conditions(rssi: int, minor_id: str, mqtt_client: Any, gateway_e
     #   SAFE only if: (Correct Floor) AND (Strong Signal)
     
     is_wrong_floor = False
-    is_weak_signal = rssi < ProximityConfig.RSSI_THRESHOLD
+    is_weak_signal = rssi < rssi_threshold
     
     # Check Location Correctness
     if detection_floor_id != "UNKNOWN" and home_floor_id != "UNKNOWN":
         if detection_floor_id != home_floor_id:
             is_wrong_floor = True
-            print(f"   ❌ MISMATCH: Home {home_floor_id} != Detected {detection_floor_id}")
+            logger.debug("   ❌ MISMATCH: Home %s != Detected %s", home_floor_id, detection_floor_id)
         else:
-            print(f"   ✅ MATCH: Home {home_floor_id} == Detected {detection_floor_id}")
+            logger.debug("   ✅ MATCH: Home %s == Detected %s", home_floor_id, detection_floor_id)
             
     # Determine Final State
     if is_wrong_floor:
         is_safe_zone = False
-        print(f"   🚨 ALARM REASON: WRONG FLOOR")
+        logger.debug("   🚨 ALARM REASON: WRONG FLOOR")
     elif is_weak_signal:
         is_safe_zone = False
-        print(f"   🚨 ALARM REASON: WEAK SIGNAL ({rssi} <= {ProximityConfig.RSSI_THRESHOLD})")
+        logger.debug("   🚨 ALARM REASON: WEAK SIGNAL (%d <= %d)", rssi, rssi_threshold)
     else:
         is_safe_zone = True
-        print(f"   🟢 SAFE REASON: CORRECT FLOOR + STRONG SIGNAL")
+        logger.debug("   🟢 SAFE REASON: CORRECT FLOOR + STRONG SIGNAL")
 
     # Determine Target Sensor (The one on the DETECTION floor)
     target_sensor_eui = detection_floor.get("macro_sensor_eui") if detection_floor else ProximityConfig.MACRO_SENSOR_EUI
@@ -225,47 +525,57 @@ def check_alarm_conditions(rssi: int, minor_id: str, mqtt_client: Any, gateway_e
     # STARTUP SILENCE (First Detection)
     # =========================================================
     if not state.initialized:
-        print(f"   🚀 STARTUP: First detection of {minor_id} - Forcing SILENCE")
-        stop_alarm(mqtt_client, target_sensor_eui, minor_id)
+        # Beacons sharing a sensor all sync at once on startup; one MUTE is enough
+        if (_last_cmd_by_sensor.get(target_sensor_eui or ProximityConfig.MACRO_SENSOR_EUI)
+                == ProximityConfig.CMD_VOLUME_MUTE):
+            logger.info("   🚀 STARTUP: First detection of %s - sensor already muted", minor_id)
+        else:
+            logger.info("   🚀 STARTUP: First detection of %s - Forcing SILENCE", minor_id)
+            # QoS 1: the startup mute is the one downlink worth a PUBACK round-trip
+            stop_alarm(mqtt_client, target_sensor_eui, minor_id, qos=1)
         
         # Initialize state
         state.initialized = True
-        state.zone = SecurityZone.SAFE
+        state.zone = _ZONE_SAFE
         state.weak_start = None
         state.current_location = detection_floor_name
+        _state_dirty.set()
         
-        return "SAFE"
+        _touch_view(state)
+        return SecurityZone.SAFE
     
     # =========================================================
     # SAFE ZONE (Correct Floor)
     # ACTION: SILENCE
     # =========================================================
     if is_safe_zone:
-        print(f" → 🟢 SAFE ZONE (Correct Floor)")
+        logger.debug(" → 🟢 SAFE ZONE (Correct Floor)")
         
-        if state.alarm_active or not state.initialized:
-            if not state.initialized:
-                print(f"   🔄 First detection - Forcing state sync (SILENCE)")
-            else:
-                print(f"   ✅ Returned to Home Floor - Stopping alarm on {target_sensor_eui}")
-                
+        # (state.initialized is always True here - the startup block returned)
+        if state.alarm_active:
+            logger.info("   ✅ Returned to Home Floor - Stopping alarm on %s", target_sensor_eui)
             stop_alarm(mqtt_client, target_sensor_eui, minor_id)
             state.alarm_active = False
-            state.initialized = True
         
-        state.zone = SecurityZone.SAFE
-        state.weak_start = None
-        state.initialized = True
+        state.safe_floor = detection_floor
         
-        if old_zone is not None and old_zone != state.zone:
-            EventManager.emit("beacon_state_change", {
-                "beacon_id": minor_id,
-                "old_state": old_zone.value if old_zone else "UNKNOWN",
-                "new_state": state.zone.value,
-                "rssi": rssi
-            })
+        # Only entering SAFE writes the zone; weak_start is only ever set
+        # while the zone is ALARM, so a SAFE beacon already has it cleared
+        if old_zone != _ZONE_SAFE:
+            state.zone = _ZONE_SAFE
+            state.weak_start = None
+            _state_dirty.set()
             
-        return "SAFE"
+            if old_zone is not None:
+                _emit_state_change(state, {
+                    "beacon_id": minor_id,
+                    "old_state": old_zone,
+                    "new_state": _ZONE_SAFE,
+                    "rssi": rssi
+                }, now)
+        
+        _touch_view(state)
+        return SecurityZone.SAFE
 
     # =========================================================
     # ALARM ZONE (Wrong Floor)
@@ -274,46 +584,47 @@ def check_alarm_conditions(rssi: int, minor_id: str, mqtt_client: Any, gateway_e
     else:
         # Start debounce timer for ALARM
         if state.weak_start is None:
-            state.weak_start = time.time()
-            state.zone = SecurityZone.ALARM # Using ALARM/WEAK pending confirmation
-            print(f" → � LEAVING SAFE ZONE - monitoring...")
+            state.weak_start = now
+            state.zone = _ZONE_ALARM # Using ALARM/WEAK pending confirmation
+            logger.info(" → � LEAVING SAFE ZONE - monitoring...")
+            
+            if old_zone != state.zone:
+                _state_dirty.set()
             
             if old_zone is not None and old_zone != state.zone:
-                 EventManager.emit("beacon_state_change", {
+                _emit_state_change(state, {
                     "beacon_id": minor_id,
-                    "old_state": old_zone.value if old_zone else "UNKNOWN",
-                    "new_state": state.zone.value,
+                    "old_state": old_zone or "UNKNOWN",
+                    "new_state": state.zone,
                     "rssi": rssi
-                })
-            return "ALARM"
+                }, now)
+            _touch_view(state)
+            return SecurityZone.ALARM
 
-        duration = time.time() - state.weak_start
+        duration = now - state.weak_start
         
         # Trigger buzz if signal remains weak (Far away)
-        if duration >= ProximityConfig.DEBOUNCE_SECONDS:
-            print(f" → � ALARM ZONE (Confirmed Away for {duration:.1f}s)")
+        if duration >= debounce_seconds:
+            logger.debug(" → � ALARM ZONE (Confirmed Away for %.1fs)", duration)
             
             if not state.alarm_active:
-                print(f"\n🚨 ═══════════════════════════════════════════")
-                print(f"🚨  ALARM ZONE ACTIVATION (Buzzing)")
-                print(f"🚨  Beacon: {minor_id}")
-                print(f"🚨  Location: {detection_floor_name} (Wrong Floor!)")
-                print(f"🚨  Target Sensor: {target_sensor_eui}")
-                print(f"🚨 ═══════════════════════════════════════════\n")
+                logger.warning("🚨 ALARM %s rssi=%d location=%s sensor=%s",
+                               minor_id, rssi, detection_floor_name, target_sensor_eui)
                 
                 trigger_alarm_with_sequence(mqtt_client, target_sensor_eui, minor_id)
                 state.alarm_active = True
                 
-            state.zone = SecurityZone.ALARM
-            return "ALARM"
+            state.zone = _ZONE_ALARM
+            _touch_view(state)
+            return SecurityZone.ALARM
         else:
-             print(f" → � LEAVING ({duration:.1f}s / {ProximityConfig.DEBOUNCE_SECONDS}s)")
-             return "ALARM"
+             logger.debug(" → � LEAVING (%.1fs / %ss)", duration, debounce_seconds)
+             _touch_view(state)
+             return SecurityZone.ALARM
 
 
-def check_floor_security(rssi: int, minor_id: str, mqtt_client: Any) -> SecurityZone:
-    result = check_alarm_conditions(rssi, minor_id, mqtt_client)
-    return SecurityZone[result]
+def check_floor_security(rssi: int, minor_id: str, mqtt_client: Any) -> Optional[SecurityZone]:
+    return check_alarm_conditions(rssi, minor_id, mqtt_client)
 
 
 # =============================================================================
@@ -324,10 +635,10 @@ def trigger_alarm_with_sequence(mqtt_client: Any, sensor_eui: str, beacon_minor:
     """
     Trigger alarm by sending UNMUTE + AC Search Beacon commands.
     
-    Sequence:
-    1. Send B0000101 (UNMUTE - Set Volume HIGH)
-    2. Wait briefly for device to process
-    3. Send AC + MsgID + Minor (Search Beacon)
+    Sequence (scheduled, does not block the caller):
+    1. Send B0000104 (Set Volume HIGH) as soon as the sensor is free
+    2. Send B0000206 (Duration) COMMAND_DELAY later
+    3. Send AC + MsgID + Minor (Search Beacon) COMMAND_DELAY after that
     
     Args:
         mqtt_client: MQTT client for publishing downlinks
@@ -335,62 +646,65 @@ def trigger_alarm_with_sequence(mqtt_client: Any, sensor_eui: str, beacon_minor:
         beacon_minor: Beacon Minor ID (e.g., "64B0", "64AF")
     
     Returns:
-        bool: True if commands sent successfully
+        bool: True once the sequence is scheduled
     """
-    global _msg_id_counter
+    minor = _norm_minor(beacon_minor)
+    
+    logger.info("🚨 TRIGGER ALARM SEQUENCE: sensor=%s minor=%s", sensor_eui, minor)
     
-    minor = beacon_minor.upper().zfill(4)
+    # MsgID increments to ensure each command is unique
+    mid = next(_msg_ids) & 0xFF
     
-    print(f"\n🚨 TRIGGER ALARM SEQUENCE")
-    print(f"   Target Sensor: {sensor_eui}")
-    print(f"   Beacon Minor: {minor}")
+    trigger_hex = _SEARCH_PREFIX[mid] + minor  # AC + MsgID + Major + Minor
+    pace_key = sensor_eui or ProximityConfig.MACRO_SENSOR_EUI
     
     # Step 1: Set buzzer volume to 4 (loudest)
-    print(f"\n   📢 Step 1: Set Volume to LOUDEST (4)")
-    _send_downlink_to_device(
-        mqtt_client, 
-        sensor_eui, 
+    _schedule_downlink_at(
+        _reserve_downlink_slot(pace_key, ProximityConfig.CMD_VOLUME_HIGH),
+        _run_sequence_step, mqtt_client, sensor_eui,
         ProximityConfig.CMD_VOLUME_HIGH,  # B0000104
-        "VOLUME (Level=4)"
+        "VOLUME (Level=4)",
+        "📢 Step 1: Set Volume to LOUDEST (4)"
     )
     
-    time.sleep(ProximityConfig.COMMAND_DELAY)
-    
     # Step 2: Set buzzer duration to 60s
-    print(f"\n   ⏱️ Step 2: Set Duration to 60s")
-    _send_downlink_to_device(
-        mqtt_client, 
-        sensor_eui, 
+    _schedule_downlink_at(
+        _reserve_downlink_slot(pace_key, ProximityConfig.CMD_DURATION),
+        _run_sequence_step, mqtt_client, sensor_eui,
         ProximityConfig.CMD_DURATION,  # B0000206
-        "DURATION (60s)"
+        "DURATION (60s)",
+        "⏱️ Step 2: Set Duration to 60s"
     )
     
-    time.sleep(ProximityConfig.COMMAND_DELAY)
-    
     # Step 3: Send AC Search Beacon command
-    # MsgID increments to ensure each command is unique
-    msg_id = f"{_msg_id_counter:02X}"
-    _msg_id_counter = (_msg_id_counter + 1) % 256
-    
-    trigger_hex = f"AC{msg_id}{ProximityConfig.BEACON_MAJOR}{minor}"  # AC + MsgID + Major + Minor
-    
-    print(f"\n   🔔 Step 3: SEARCH BEACON ({trigger_hex})")
-    trigger_success = _send_downlink_to_device(
-        mqtt_client, 
-        sensor_eui, 
-        trigger_hex, 
-        f"SEARCH BEACON ({trigger_hex})"
+    _schedule_downlink_at(
+        _reserve_downlink_slot(pace_key, trigger_hex),
+        _run_sequence_step, mqtt_client, sensor_eui,
+        trigger_hex,
+        f"SEARCH BEACON ({trigger_hex})",
+        f"🔔 Step 3: SEARCH BEACON ({trigger_hex})",
+        True
     )
     
-    if trigger_success:
-        print(f"\n   ✅ Alarm trigger sequence complete!")
-    else:
-        print(f"\n   ❌ Failed to send search command!")
+    return True
+
+
+def _run_sequence_step(mqtt_client: Any, sensor_eui: str, hex_cmd: str,
+                       cmd_name: str, title: str, last: bool = False) -> bool:
+    """One step of trigger_alarm_with_sequence (runs on the scheduler thread)."""
+    logger.info("   %s", title)
+    success = _send_downlink_to_device(mqtt_client, sensor_eui, hex_cmd, cmd_name)
+    
+    if last:
+        if success:
+            logger.info("   ✅ Alarm trigger sequence complete!")
+        else:
+            logger.error("   ❌ Failed to send search command!")
     
-    return trigger_success
+    return success
 
 
-def stop_alarm(mqtt_client: Any, sensor_eui: str, beacon_minor: str) -> bool:
+def stop_alarm(mqtt_client: Any, sensor_eui: str, beacon_minor: str, qos: int = 0) -> Optional[bool]:
     """
     Stop alarm by sending the B0000100 MUTE command.
     
@@ -400,26 +714,29 @@ def stop_alarm(mqtt_client: Any, sensor_eui: str, beacon_minor: str) -> bool:
         mqtt_client: MQTT client for publishing downlinks
         sensor_eui: Target sensor's DevEUI
         beacon_minor: Beacon Minor ID (not used, but kept for consistency)
+        qos: MQTT QoS for the publish (0 = fire and forget)
     
     Returns:
-        bool: True if command sent successfully
+        bool: True if the command was sent, False if it failed, or None if
+        it was queued behind the sensor's pending downlinks
     """
     # B0000100 = Set volume to 0 (MUTE/STOP)
     stop_hex = "B0000100"
     
-    print(f"   🔇 STOP ALARM: {stop_hex} (Mute)")
+    logger.info("   🔇 STOP ALARM: %s (Mute)", stop_hex)
     
-    success = _send_downlink_to_device(
+    success = _send_paced(
         mqtt_client, 
         sensor_eui, 
         stop_hex, 
-        "MUTE (Volume=0)"
+        "MUTE (Volume=0)",
+        qos
     )
     
     return success
 
 
-def unmute_alarm(mqtt_client: Any, sensor_eui: str, beacon_minor: str) -> bool:
+def unmute_alarm(mqtt_client: Any, sensor_eui: str, beacon_minor: str) -> Optional[bool]:
     """
     Unmute alarm by sending the B0000101 command (Volume HIGH).
     
@@ -431,14 +748,15 @@ def unmute_alarm(mqtt_client: Any, sensor_eui: str, beacon_minor: str) -> bool:
         beacon_minor: Beacon Minor ID (not used, but kept for consistency)
     
     Returns:
-        bool: True if command sent successfully
+        bool: True if the command was sent, False if it failed, or None if
+        it was queued behind the sensor's pending downlinks
     """
     # B0000103 = Set volume to 3 (HIGH/UNMUTE)
     unmute_hex = "B0000101"
     
-    print(f"   📢 UNMUTE ALARM: {unmute_hex} (Volume HIGH)")
+    logger.info("   📢 UNMUTE ALARM: %s (Volume HIGH)", unmute_hex)
     
-    success = _send_downlink_to_device(
+    success = _send_paced(
         mqtt_client, 
         sensor_eui, 
         unmute_hex, 
@@ -463,23 +781,55 @@ def start_alarm(mqtt_client: Any, sensor_eui: str, beacon_minor: str) -> bool:
         bool: True if commands sent successfully
     """
     
-    print(f"\n   🔔 START ALARM for beacon {beacon_minor}")
+    logger.info("   🔔 START ALARM for beacon %s", beacon_minor)
     return trigger_alarm_with_sequence(mqtt_client, sensor_eui, beacon_minor)
 
-def _send_downlink_to_device(mqtt_client: Any, device_eui: str, hex_cmd: str, cmd_name: str) -> bool:
+# Serialized payloads for the fixed commands, keyed by (hex_cmd, eui, fport)
+_PAYLOAD_CACHE: Dict[tuple, bytes] = {}
+
+
+def _downlink_payload(target_eui: str, hex_cmd: str, fport: int) -> bytes:
+    key = (hex_cmd, target_eui, fport)
+    payload = _PAYLOAD_CACHE.get(key)
+    if payload is not None:
+        return payload
+    
+    data_b64 = _PRECOMPUTED_B64.get(hex_cmd)
+    if data_b64 is None:
+        # Dynamic command (e.g. AC search with a fresh MsgID): build, don't cache
+        data_b64 = b2a_base64(unhexlify(hex_cmd), newline=False)
+        return _DOWNLINK_TEMPLATE % (target_eui.encode(), fport, data_b64)
+    
+    payload = _DOWNLINK_TEMPLATE % (target_eui.encode(), fport, data_b64)
+    _PAYLOAD_CACHE[key] = payload
+    return payload
+
+
+@functools.lru_cache(maxsize=64)
+def _topic_for(app_id: str, device_eui: str) -> str:
+    return f"application/{app_id}/device/{device_eui}/command/down"
+
+
+def _send_downlink_to_device(mqtt_client: Any, device_eui: str, hex_cmd: str, cmd_name: str,
+                             qos: int = 0) -> bool:
     """
     Send a downlink command to a specific device.
     
+    Downlinks are fire and forget by default (QoS 0, not retained): the
+    buzzer commands are idempotent and LoRaWAN has its own delivery path,
+    so waiting for a PUBACK only adds latency.
+    
     Args:
         mqtt_client: MQTT client
         device_eui: Target device's DevEUI
         hex_cmd: Hex command string (e.g., "B0000101")
         cmd_name: Human-readable command name for logging
+        qos: MQTT QoS for the publish
     
     Returns:
-        bool: True if published successfully
+        bool: True if the publish was accepted by the MQTT client
     """
-    global _app_id
+    fport = ProximityConfig.FPORT
     
     # Use the target sensor EUI passed in, or fallback to default
     target_eui = device_eui if device_eui else ProximityConfig.MACRO_SENSOR_EUI
@@ -489,34 +839,38 @@ def _send_downlink_to_device(mqtt_client: Any, device_eui: str, hex_cmd: str, cm
     app_id = _app_id
     
     if not app_id:
-        print("   ⚠️ WARNING: No dynamic App ID captured yet! Falling back to Config ID.")
+        logger.warning("   ⚠️ WARNING: No dynamic App ID captured yet! Falling back to Config ID.")
         app_id = ProximityConfig.MACRO_SENSOR_APP_ID
     
+    topic = _topic_for(app_id, target_eui)
+    
     try:
-        topic = f"application/{app_id}/device/{target_eui}/command/down"
-        
-        data_bytes = bytes.fromhex(hex_cmd)
-        data_b64 = base64.b64encode(data_bytes).decode('utf-8')
-        
-        payload = {
-            "devEui": target_eui,
-            "confirmed": False,
-            "fPort": ProximityConfig.FPORT,
-            "data": data_b64
-        }
-        
-        # DEBUG: Print full details
-        print(f"   📡 {cmd_name}: {hex_cmd} → FPort {ProximityConfig.FPORT}")
-        print(f"   📝 Topic: {topic}")
-        print(f"   📝 App ID: {app_id}")
-        print(f"   📝 Payload: {json.dumps(payload)}")
-        
-        mqtt_client.publish(topic, json.dumps(payload))
-        return True
-        
+        payload = _downlink_payload(target_eui, hex_cmd, fport)
+    except ValueError as e:  # hex_cmd is not valid hex (e.g. a bad Minor ID)
+        logger.error("   ❌ Invalid command %s: %s", hex_cmd, e)
+        return False
+    
+    # DEBUG: Print full details
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("   📡 %s: %s → FPort %d", cmd_name, hex_cmd, fport)
+        logger.debug("   📝 Topic: %s", topic)
+        logger.debug("   📝 App ID: %s", app_id)
+        logger.debug("   📝 Payload: %s", payload.decode())
+    
+    try:
+        info = mqtt_client.publish(topic, payload, qos=qos, retain=False)
     except Exception as e:
-        print(f"   ❌ Error: {e}")
+        logger.error("   ❌ Error: %s", e)
+        return False
+    
+    # publish() only queues the message for paho's network thread; don't
+    # wait_for_publish() here - it would stall uplink processing
+    if info is None or info.rc != MQTT_ERR_SUCCESS:
+        logger.error("   ❌ %s not sent (rc=%s)", cmd_name, getattr(info, "rc", "not connected"))
+        # Unknown sensor state now - don't let a later MUTE be skipped
+        _last_cmd_by_sensor.pop(target_eui, None)
         return False
+    return True
 
 
 # =============================================================================
@@ -525,7 +879,7 @@ def _send_downlink_to_device(mqtt_client: Any, device_eui: str, hex_cmd: str, cm
 
 def manual_trigger_alarm(mqtt_client: Any, minor_id: str) -> bool:
     """Manually trigger alarm for a specific beacon."""
-    print(f"\n🔔 Manual Alarm: {minor_id}")
+    logger.info("🔔 Manual Alarm: %s", minor_id)
     return trigger_alarm_with_sequence(
         mqtt_client, 
         ProximityConfig.MACRO_SENSOR_EUI, 
@@ -533,10 +887,15 @@ def manual_trigger_alarm(mqtt_client: Any, minor_id: str) -> bool:
     )
 
 
-def manual_silence_alarm(mqtt_client: Any) -> bool:
-    """Manually silence the alarm."""
-    print(f"\n🔇 Manual Silence")
-    return _send_downlink_to_device(
+def manual_silence_alarm(mqtt_client: Any) -> Optional[bool]:
+    """
+    Manually silence the alarm.
+    
+    Returns None (not True) when the MUTE is queued behind downlinks still
+    pending for the sensor, so callers don't report it as sent yet.
+    """
+    logger.info("🔇 Manual Silence")
+    return _send_paced(
         mqtt_client,
         ProximityConfig.MACRO_SENSOR_EUI,
         ProximityConfig.CMD_VOLUME_MUTE,
@@ -1,38 +1,86 @@
+import re
 import base64
+import logging
+from functools import lru_cache
+from typing import NamedTuple, Optional
 from src.config import settings
 
+logger = logging.getLogger(__name__)
+
+
+class Beacon(NamedTuple):
+    """One decoded beacon sighting (a tuple - cheaper than a dict per slot)."""
+    id: str
+    minor: str
+    rssi: int
+    tracked: bool
+    matched_id: Optional[str]
+    name: str
+
+
 # Global watchlist (loaded at module import)
 _watchlist = None
 
+# Tracked IDs are normally 4-char Minor IDs, matched with one set lookup on
+# the beacon's Minor. Any other IDs (e.g. full Major+Minor) fall back to a
+# substring match, compiled into one regex alternation. Both are rebuilt
+# whenever the watchlist changes (load, reload, auto-discovery).
+_watchlist_minors = frozenset()
+_watchlist_matcher = None
+
 def get_watchlist():
     """Returns the current watchlist, loading it if needed."""
     global _watchlist
     if _watchlist is None:
         _watchlist = settings.load_watchlist()
+        _rebuild_matcher()
     return _watchlist
 
 def reload_watchlist():
     """Forces a reload of the watchlist from file."""
     global _watchlist
     _watchlist = settings.load_watchlist()
+    _rebuild_matcher()
     return _watchlist
 
+def _rebuild_matcher():
+    global _watchlist_minors, _watchlist_matcher
+    watchlist = _watchlist or {}
+    _watchlist_minors = frozenset(k for k in watchlist if len(k) == 4)
+    others = [k for k in watchlist if len(k) != 4]
+    if others:
+        _watchlist_matcher = re.compile("|".join(map(re.escape, others)))
+    else:
+        _watchlist_matcher = None  # An empty alternation would match everything
+
+def _match_tracked(beacon_upper, minor):
+    """is_beacon_tracked() for an uppercase str ID and its Minor, watchlist loaded."""
+    if minor in _watchlist_minors:
+        return True, minor
+    match = _watchlist_matcher.search(beacon_upper) if _watchlist_matcher else None
+    if match:
+        return True, match.group()
+    return False, None
+
 def is_beacon_tracked(beacon_id):
     """
     Checks if a beacon ID is in the watchlist.
-    Matches if the beacon_id contains any tracked ID.
+    Matches if the beacon's Minor (last 4 hex chars) is a tracked ID, or if
+    the beacon_id contains a longer/shorter tracked ID.
     
     Returns:
         tuple: (is_tracked: bool, matched_id: str or None)
     """
-    watchlist = get_watchlist()
+    get_watchlist()
     beacon_upper = str(beacon_id).upper()
-    
-    for tracked_id in watchlist.keys():
-        if tracked_id in beacon_upper:
-            return True, tracked_id
-    return False, None
+    return _match_tracked(beacon_upper, extract_minor_id(beacon_upper))
+
+@lru_cache(maxsize=1024)
+def _upper_cached(value):
+    """str.upper(), memoized - the same few beacon IDs arrive every uplink."""
+    return value.upper()
 
+@lru_cache(maxsize=2048)
 def extract_minor_id(full_beacon_id):
     """
     Extracts the Minor ID from a full beacon ID string.
@@ -43,6 +91,9 @@ def extract_minor_id(full_beacon_id):
         return full_id[-4:]  # Last 4 hex chars = 2 bytes = Minor
     return full_id
 
+# (beacon key, rssi key) for the gateway's 10 beacon slots
+_SLOT_KEYS = tuple((f"beacon{i}", f"rssi{i}") for i in range(1, 11))
+
 def decode_gateway_json(payload_object, filter_tracked=True):
     """
     Parses the DECODED object from the Bluetooth Gateway (ChirpStack).
@@ -62,59 +113,56 @@ def decode_gateway_json(payload_object, filter_tracked=True):
         filter_tracked: If True, only return beacons in watchlist
     
     Returns:
-        List of dicts: [{"id": "...", "minor": "...", "rssi": -XX, "tracked": bool}, ...]
+        List of Beacon tuples (id, minor, rssi, tracked, matched_id, name), or None
     """
     try:
         all_beacons = []
         watchlist = get_watchlist()
+        get = payload_object.get
+        auto_discover = settings.AUTO_DISCOVER_BEACONS
         
-        # Loop through beacon slots (beacon1, beacon2, etc.)
-        for i in range(1, 11):
-            beacon_key = f"beacon{i}"
-            rssi_key = f"rssi{i}"
+        # "number" says how many slots are filled; fall back to probing all
+        try:
+            count = max(0, int(get("number", len(_SLOT_KEYS))))
+        except (TypeError, ValueError):
+            count = len(_SLOT_KEYS)
+        
+        # Loop through beacon slots (beacon1, beacon2, etc.) - filled in order
+        for beacon_key, rssi_key in _SLOT_KEYS[:count]:
+            raw_beacon = get(beacon_key)
+            if raw_beacon is None:
+                break
+            
+            beacon_val = _upper_cached(str(raw_beacon))
+            rssi = int(get(rssi_key, -999))
             
-            if beacon_key in payload_object:
-                beacon_val = str(payload_object[beacon_key]).upper()
-                rssi = int(payload_object.get(rssi_key, -999))
-                
-                # Extract minor ID (last 4 hex chars)
-                minor_id = extract_minor_id(beacon_val)
-                
-                # Check if tracked
-                is_tracked, matched_id = is_beacon_tracked(beacon_val)
-                
-                # Get name from watchlist
-                name = watchlist.get(matched_id, {}).get("name", f"Beacon {minor_id}") if matched_id else f"Beacon {minor_id}"
-                
-                beacon_data = {
-                    "id": beacon_val,
-                    "minor": minor_id,
-                    "rssi": rssi,
-                    "tracked": is_tracked,
-                    "matched_id": matched_id,
-                    "name": name
+            # Extract minor ID (last 4 hex chars)
+            minor_id = extract_minor_id(beacon_val)
+            
+            # Check if tracked
+            is_tracked, matched_id = _match_tracked(beacon_val, minor_id)
+            
+            # Get name from watchlist
+            name = watchlist.get(matched_id, {}).get("name", f"Beacon {minor_id}") if matched_id else f"Beacon {minor_id}"
+            
+            # Auto-discovery
+            if not is_tracked and auto_discover:
+                watchlist[minor_id] = {
+                    "id": minor_id,
+                    "name": f"Auto-Discovered {minor_id}"
                 }
-                
-                # Auto-discovery
-                if not is_tracked and settings.AUTO_DISCOVER_BEACONS:
-                    watchlist[minor_id] = {
-                        "id": minor_id,
-                        "name": f"Auto-Discovered {minor_id}"
-                    }
-                    beacon_data["tracked"] = True
-                    beacon_data["matched_id"] = minor_id
-                    print(f"🆕 Auto-discovered beacon: {minor_id}")
-                
-                if filter_tracked:
-                    if beacon_data["tracked"]:
-                        all_beacons.append(beacon_data)
-                else:
-                    all_beacons.append(beacon_data)
+                _rebuild_matcher()
+                is_tracked = True
+                matched_id = minor_id
+                logger.info("🆕 Auto-discovered beacon: %s", minor_id)
+            
+            if is_tracked or not filter_tracked:
+                all_beacons.append(Beacon(beacon_val, minor_id, rssi, is_tracked, matched_id, name))
         
         return all_beacons if all_beacons else None
         
     except Exception as e:
-        print(f"Gateway Decode Error: {e}")
+        logger.error("Gateway Decode Error: %s", e)
         return None
 
 def decode_uplink(payload, filter_tracked=True):
@@ -126,7 +174,7 @@ def decode_uplink(payload, filter_tracked=True):
         filter_tracked: If True, only return tracked beacons
     
     Returns:
-        List of beacon dicts or None
+        List of Beacon tuples or None
     """
     try:
         # Try Gateway JSON Object (if pre-decoded by ChirpStack JS decoder)
@@ -148,5 +196,5 @@ def decode_uplink(payload, filter_tracked=True):
         return None
 
     except Exception as e:
-        print(f"Decode Error: {e}")
+        logger.error("Decode Error: %s", e)
         return None
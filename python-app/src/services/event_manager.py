@@ -6,8 +6,9 @@ This allows different parts of the system to subscribe to events without
 tight coupling.
 """
 
-from typing import Callable, Dict, List, Any
+from typing import Callable, Dict, Tuple, Any
 import logging
+import threading
 
 # Configure basic logging if not already configured
 logging.basicConfig(level=logging.INFO)
@@ -15,7 +16,10 @@ logger = logging.getLogger(__name__)
 
 class EventManager:
     _instance = None
-    _subscribers: Dict[str, List[Callable]] = {}
+    # Copy-on-write: subscribe() swaps in a new dict of tuples, so emit()
+    # (called on the MQTT thread) iterates a snapshot without locking
+    _subscribers: Dict[str, Tuple[Callable, ...]] = {}
+    _subscribe_lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
@@ -33,9 +37,12 @@ class EventManager:
             callback: The function to call when the event is emitted.
                       Should accept a single argument (the data payload).
         """
-        if event_name not in cls._subscribers:
-            cls._subscribers[event_name] = []
-        cls._subscribers[event_name].append(callback)
+        with cls._subscribe_lock:
+            subscribers = cls._subscribers
+            cls._subscribers = {
+                **subscribers,
+                event_name: subscribers.get(event_name, ()) + (callback,)
+            }
         logger.info(f"Subscribed to event: {event_name}")
 
     @classmethod
@@ -47,9 +54,8 @@ class EventManager:
             event_name: The name of the event to emit.
             data: Optional data payload to pass to subscribers.
         """
-        if event_name in cls._subscribers:
-            for callback in cls._subscribers[event_name]:
-                try:
-                    callback(data)
-                except Exception as e:
-                    logger.error(f"Error in event listener for {event_name}: {e}")
+        for callback in cls._subscribers.get(event_name, ()):
+            try:
+                callback(data)
+            except Exception as e:
+                logger.error(f"Error in event listener for {event_name}: {e}")
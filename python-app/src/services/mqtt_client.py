@@ -1,41 +1,99 @@
 import paho.mqtt.client as mqtt
+import queue
+import socket
 import threading
-import json
 from src.config import settings
 
+try:
+    import orjson as _json
+except ImportError:  # orjson is optional - stdlib json also accepts bytes
+    import json as _json
+
 class MQTTClient:
     def __init__(self, on_message_callback):
         self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
+        self.client.max_inflight_messages_set(settings.MQTT_MAX_INFLIGHT)
+        self.client.max_queued_messages_set(settings.MQTT_MAX_QUEUED)
+        self.client.reconnect_delay_set(min_delay=settings.MQTT_RECONNECT_MIN_DELAY,
+                                        max_delay=settings.MQTT_RECONNECT_MAX_DELAY)
         self.on_message_callback = on_message_callback
         self.connected = False
+        # {topic: qos} currently subscribed; on_connect (paho thread) and
+        # resubscribe (Tk thread) both update it
+        self._subscriptions = {}
+        self._sub_lock = threading.Lock()
+        
+        # Uplinks are handed to a worker thread, so paho's network thread
+        # only enqueues and keep-alives/acks never wait on alarm logic
+        self._rx_q = queue.SimpleQueue()
+        self._rx_worker = threading.Thread(target=self._process_uplinks, daemon=True)
+        self._rx_worker.start()
 
     def on_connect(self, client, userdata, flags, rc, properties=None):
         if rc == 0:
             self.connected = True
             print("Connected to MQTT")
-            client.subscribe(settings.TOPIC)
+            # Send small downlinks immediately instead of waiting on Nagle
+            client.socket().setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._sub_lock:
+                self._subscriptions = dict(settings.get_uplink_subscriptions())
+                client.subscribe(list(self._subscriptions.items()))
         else:
             print(f"Connection Failed: {rc}")
 
+    def resubscribe(self):
+        """
+        Bring the uplink subscriptions in line with the current config,
+        e.g. after a Bluetooth gateway was added or changed in devices.json.
+        Only topics that were added or removed are (un)subscribed. When not
+        connected, the next on_connect subscribes the full list anyway.
+        """
+        wanted = dict(settings.get_uplink_subscriptions())
+        with self._sub_lock:
+            current = self._subscriptions
+            added = [(topic, qos) for topic, qos in wanted.items() if current.get(topic) != qos]
+            removed = [topic for topic in current if topic not in wanted]
+            self._subscriptions = wanted
+            if not self.connected:
+                return
+            if removed:
+                self.client.unsubscribe(removed)
+            if added:
+                self.client.subscribe(added)
+        if added or removed:
+            print(f"MQTT subscriptions updated: +{len(added)} -{len(removed)}")
+
     def on_message(self, client, userdata, msg):
-        try:
-            payload = json.loads(msg.payload.decode())
-            self.on_message_callback(payload)
-        except Exception as e:
-            print(f"MQTT Rx Error: {e}")
+        self._rx_q.put(msg.payload)
+
+    def _process_uplinks(self):
+        """Decode and dispatch queued uplinks in arrival order."""
+        while True:
+            raw = self._rx_q.get()
+            try:
+                payload = _json.loads(raw)
+                self.on_message_callback(payload)
+            except Exception as e:
+                print(f"MQTT Rx Error: {e}")
 
     def connect(self):
         try:
             print(f"Connecting to MQTT Broker at {settings.BROKER_ADDRESS}:{settings.BROKER_PORT}...")
             self.client.connect(settings.BROKER_ADDRESS, settings.BROKER_PORT, 60)
-            # Run loop in background thread
-            t = threading.Thread(target=self.client.loop_forever, daemon=True)
-            t.start()
+            # Paho's own background network thread (reconnects automatically)
+            self.client.loop_start()
         except Exception as e:
             print(f"MQTT Connection Error: {e}")
 
-    def publish(self, topic, payload):
+    def publish(self, topic, payload, qos=0, retain=False):
+        """
+        Queue a message for the network loop thread and return immediately.
+        
+        Returns paho's MQTTMessageInfo (check .rc; call .wait_for_publish()
+        only off the network thread), or None when not connected.
+        """
         if self.connected:
-            self.client.publish(topic, payload) 
+            return self.client.publish(topic, payload, qos=qos, retain=retain)
+        return None 
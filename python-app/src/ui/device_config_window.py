@@ -14,8 +14,34 @@ Version: 1.0
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import json
 import os
+import re
+import sys
+import queue
+import hashlib
+import logging
+import tempfile
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+try:
+    import orjson as _json
+
+    def _dumps_indented(obj):
+        return _json.dumps(obj, option=_json.OPT_INDENT_2)
+except ImportError:  # orjson is optional - stdlib json writes the same 2-space layout
+    import json as _json
+
+    def _dumps_indented(obj):
+        return _json.dumps(obj, indent=2).encode()
+
+
+logger = logging.getLogger(__name__)
+
+# DevEUIs / gateway IDs are 16 lowercase hex digits (entries are lowercased first)
+_EUI_RE = re.compile(r"[0-9a-f]{16}")
 
 
 class DeviceConfigWindow:
@@ -23,7 +49,22 @@ class DeviceConfigWindow:
     Settings window for configuring IoT devices and floor assignments.
     """
     
-    CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "devices.json")
+    # python-app/devices.json (this file is python-app/src/ui/device_config_window.py)
+    CONFIG_FILE = Path(__file__).resolve().parents[2] / "devices.json"
+    
+    # Edits are auto-saved once they have been quiet for this long, so a
+    # burst (add floor, rename it, assign beacons) costs a single write
+    SAVE_DEBOUNCE_MS = 750
+    
+    # How often the Tk thread checks whether the background config load is done
+    LOAD_POLL_MS = 20
+    
+    # How long closing the window waits for the last background write
+    SAVE_TIMEOUT_S = 5
+    
+    # How long footer status messages stay visible
+    STATUS_MS = 1500
+    WARNING_STATUS_MS = 4000
     
     def __init__(self, parent, on_save_callback=None):
         """
@@ -35,8 +76,32 @@ class DeviceConfigWindow:
         """
         self.parent = parent
         self.on_save_callback = on_save_callback
-        self.config_data = self._load_config()
+        # devices.json is parsed on a worker thread; until _apply_config runs
+        # the window shows an empty, non-saveable config
+        self.config_data = {"floors": [], "beacons": []}
+        self._last_saved_hash = None
+        self._config_loaded = False
+        self._load_results = queue.SimpleQueue()
+        self._load_poll_id = None
+        self._rebuild_indexes()
         self.selected_floor_id = None
+        self._pending_save_id = None
+        self._dirty = False
+        self._saved = False
+        
+        # Writes run on one cfg-io thread, so they stay off the Tk loop and in order
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cfg-io")
+        self._save_future = None
+        self._status_clear_id = None
+        
+        # Bumped on every config change; lets the populate methods skip
+        # rebuilding views that are already current. The beacon tree's rows
+        # only depend on which beacons exist, so they have their own version
+        self._cfg_version = 0
+        self._floor_labels_version = -1
+        self._beacon_content_version = 0
+        self._beacon_displayed_version = -1
+        self._shown_assigned = set()
         
         # Create toplevel window
         self.window = tk.Toplevel(parent)
@@ -45,6 +110,7 @@ class DeviceConfigWindow:
         self.window.configure(bg="#1a1a2e")
         self.window.transient(parent)
         self.window.grab_set()
+        self.window.protocol("WM_DELETE_WINDOW", self._close)
         
         # Color scheme (matching main window)
         self.colors = {
@@ -57,49 +123,279 @@ class DeviceConfigWindow:
             "warning": "#fbbf24"
         }
         
+        self._configure_styles()
         self._build_ui()
-        self._populate_floors()
-        
-        # Select first floor if exists
-        if self.config_data.get("floors"):
-            self._select_floor(self.config_data["floors"][0]["id"])
+        self.floor_listbox.insert(tk.END, "Loading…")
+        self._async_load_config()
     
-    def _load_config(self):
-        """Load configuration from devices.json."""
+    @staticmethod
+    def _digest(payload):
+        """Fingerprint of serialized config bytes, used to skip redundant saves."""
+        return hashlib.blake2b(payload, digest_size=16).digest()
+    
+    def _read_config(self):
+        """
+        Load configuration from devices.json.
+        Touches no Tk state, so it can run on the loader thread.
+        
+        Returns:
+            tuple: (config dict, digest of the file bytes or None)
+        """
         default_config = {
             "floors": [],
             "beacons": []
         }
         
-        if os.path.exists(self.CONFIG_FILE):
+        if self.CONFIG_FILE.exists():
             try:
-                with open(self.CONFIG_FILE, 'r') as f:
-                    return json.load(f)
+                raw = self.CONFIG_FILE.read_bytes()
+                return self._intern_ids(_json.loads(raw)), self._digest(raw)
             except Exception as e:
                 print(f"⚠️ Failed to load config: {e}")
         
-        return default_config
+        return default_config, None
     
-    def _save_config(self):
-        """Save configuration to devices.json."""
+    @staticmethod
+    def _intern_ids(config):
+        """
+        Intern floor/beacon ids and beacon floor_ids in place, so the id
+        indexes and floor_id comparisons work on shared string objects.
+        """
+        for floor in config.get("floors", []):
+            if isinstance(floor.get("id"), str):
+                floor["id"] = sys.intern(floor["id"])
+        for beacon in config.get("beacons", []):
+            if isinstance(beacon.get("id"), str):
+                beacon["id"] = sys.intern(beacon["id"])
+            if isinstance(beacon.get("floor_id"), str):
+                beacon["floor_id"] = sys.intern(beacon["floor_id"])
+        return config
+    
+    def _async_load_config(self):
+        """Read devices.json on a worker thread and poll for the result."""
+        threading.Thread(target=self._load_worker, name="cfg-load", daemon=True).start()
+        self._poll_config_load()
+    
+    def _load_worker(self):
+        """Loader thread body: hand the parsed config back to the Tk thread."""
+        self._load_results.put(self._read_config())
+    
+    def _poll_config_load(self):
+        """Apply the loaded config once the worker has delivered it."""
         try:
-            with open(self.CONFIG_FILE, 'w') as f:
-                json.dump(self.config_data, f, indent=2)
+            config, digest = self._load_results.get_nowait()
+        except queue.Empty:
+            self._load_poll_id = self.window.after(self.LOAD_POLL_MS, self._poll_config_load)
+            return
+        
+        self._load_poll_id = None
+        self._apply_config(config, digest)
+    
+    def _apply_config(self, config, digest):
+        """Install a freshly loaded config and fill the UI from it."""
+        self.config_data = config
+        self._last_saved_hash = digest
+        self._rebuild_indexes()
+        self._config_loaded = True
+        self._cfg_version += 1
+        self._beacon_content_version += 1
+        self._populate_floors()
+        
+        # Select first floor if exists
+        if self.config_data.get("floors"):
+            self._select_floor(self.config_data["floors"][0]["id"])
+    
+    def _rebuild_indexes(self):
+        """Index floors by id and beacons by their assigned floor_id."""
+        self._floors_by_id = {}
+        for floor in self.config_data.get("floors", []):
+            self._floors_by_id.setdefault(floor["id"], floor)
+        
+        self._beacons_by_id = {}
+        self._beacon_ids = set()  # Upper-cased, for duplicate checks
+        self._beacons_by_floor = defaultdict(list)
+        for beacon in self.config_data.get("beacons", []):
+            self._beacons_by_id.setdefault(beacon["id"], beacon)
+            self._beacon_ids.add(beacon["id"].upper())
+            if beacon.get("floor_id") is not None:
+                self._beacons_by_floor[beacon["floor_id"]].append(beacon)
+    
+    def _assign_beacon(self, beacon, floor_id):
+        """Move a beacon to floor_id (None unassigns it), keeping the index in sync."""
+        old_floor_id = beacon.get("floor_id")
+        if old_floor_id == floor_id:
+            return
+        if old_floor_id is not None and beacon in self._beacons_by_floor.get(old_floor_id, ()):
+            self._beacons_by_floor[old_floor_id].remove(beacon)
+        beacon["floor_id"] = floor_id
+        if floor_id is not None:
+            self._beacons_by_floor[floor_id].append(beacon)
+    
+    def _save_config(self):
+        """
+        Save configuration to devices.json.
+        Serializes on the Tk thread and hands the bytes to the cfg-io thread.
+        Skips the write when the serialized config matches what is already
+        on disk.
+        
+        Returns:
+            bool: False if the config could not be serialized
+        """
+        if not self._config_loaded:
+            # Never overwrite devices.json with the placeholder config
             return True
+        
+        self._check_last_write()
+        try:
+            payload = _dumps_indented(self.config_data)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save: {e}")
             return False
+        
+        digest = self._digest(payload)
+        if digest != self._last_saved_hash:
+            # Optimistic: a failed write clears it again (see _check_last_write)
+            self._last_saved_hash = digest
+            self._save_future = self._io_pool.submit(self._write_config, payload)
+        return True
+    
+    def _write_config(self, payload):
+        """
+        Atomically replace devices.json with payload (runs on the cfg-io thread).
+        Writes a temp file in the same directory and renames it over the
+        config, so readers never see a half-written file.
+        """
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile('wb', dir=self.CONFIG_FILE.parent,
+                                             suffix='.tmp', delete=False) as f:
+                tmp_path = f.name
+                f.write(payload)
+            if self.CONFIG_FILE.exists():
+                # NamedTemporaryFile is created 0600; keep the config's own mode
+                os.chmod(tmp_path, self.CONFIG_FILE.stat().st_mode & 0o777)
+            os.replace(tmp_path, self.CONFIG_FILE)
+        except Exception:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def _check_last_write(self):
+        """Forget the saved digest if the previous background write failed."""
+        future = self._save_future
+        if future is not None and future.done():
+            self._save_future = None
+            if future.exception() is not None:
+                logger.error("⚠️ Failed to save config: %s", future.exception())
+                # Still unsaved: the next flush must write it again
+                self._last_saved_hash = None
+                self._dirty = True
+    
+    def _wait_for_write(self):
+        """
+        Block until the in-flight background write (if any) has finished.
+        
+        Returns:
+            bool: False if that write failed or timed out
+        """
+        future, self._save_future = self._save_future, None
+        if future is None:
+            return True
+        try:
+            future.result(timeout=self.SAVE_TIMEOUT_S)
+            return True
+        except Exception as e:
+            # Still unsaved, so a second Close can't discard the edits
+            self._last_saved_hash = None
+            self._dirty = True
+            messagebox.showerror("Error", f"Failed to save: {str(e) or type(e).__name__}")
+            return False
+    
+    def _schedule_save(self):
+        """Record a config change and (re)arm the debounced save timer."""
+        self._cfg_version += 1
+        self._dirty = True
+        if self._pending_save_id is not None:
+            self.window.after_cancel(self._pending_save_id)
+        self._pending_save_id = self.window.after(self.SAVE_DEBOUNCE_MS, self._flush_save)
+    
+    def _flush_save(self, force=False, wait=False):
+        """
+        Write pending changes now, cancelling any armed save timer.
+        
+        Args:
+            force: Save even if nothing changed since the last write
+            wait: Block until the background write has finished
+        
+        Returns:
+            bool: False only if a write was attempted and failed
+        """
+        if self._pending_save_id is not None:
+            self.window.after_cancel(self._pending_save_id)
+            self._pending_save_id = None
+        
+        if self._dirty or force:
+            if not self._save_config():
+                return False
+            self._dirty = False
+            self._saved = True
+        
+        return self._wait_for_write() if wait else True
+    
+    def _configure_styles(self):
+        """
+        Register the window's ttk styles once, so widgets name a style
+        instead of passing bg/fg/font to every constructor.
+        """
+        style = ttk.Style(self.window)
+        card, text = self.colors["card"], self.colors["text"]
+        
+        style.configure("Header.TLabel", background=self.colors["bg"], foreground="white",
+                        font=("Helvetica", 16, "bold"))
+        style.configure("Card.TLabel", background=card, foreground=text, font=("Helvetica", 10))
+        style.configure("Hint.TLabel", background=card, foreground="#666", font=("Helvetica", 9))
+        style.configure("Card.TEntry", fieldbackground=self.colors["input_bg"],
+                        foreground=text, insertcolor="white")
+        style.configure("Status.TLabel", background=self.colors["bg"],
+                        foreground=self.colors["accent"], font=("Helvetica", 10))
+        style.configure("Warning.Status.TLabel", foreground=self.colors["warning"])
+        
+        # Buttons: one colour style each, with Small./Large. font-size variants
+        for name, bg, fg in (("Accent", self.colors["accent"], "black"),
+                             ("Danger", self.colors["danger"], "white"),
+                             ("Warning", self.colors["warning"], "black"),
+                             ("Neutral", "#4b5563", "white")):
+            style.configure(f"{name}.TButton", background=bg, foreground=fg,
+                            font=("Arial", 10, "bold"))
+            style.map(f"{name}.TButton", background=[("active", bg)])
+            style.configure(f"Small.{name}.TButton", font=("Arial", 9, "bold"))
+            style.configure(f"Large.{name}.TButton", font=("Arial", 11, "bold"))
+        
+        style.configure("Beacon.Treeview", background=self.colors["input_bg"],
+                        fieldbackground=self.colors["input_bg"],
+                        foreground=text, font=("Consolas", 11))
+        style.map("Beacon.Treeview", background=[("selected", self.colors["accent"])],
+                  foreground=[("selected", "black")])
     
     def _build_ui(self):
-        """Build the configuration UI."""
+        """
+        Build the configuration UI.
+        Only the header, floor list and footer are created here; the Floor
+        Details and Beacon Assignment sections are built the first time a
+        floor is selected (see _ensure_details_built).
+        """
+        self._details_built = False
+        self._build_header_and_floors()
+        self._build_footer()
+    
+    def _build_header_and_floors(self):
+        """Build the header and the floor list section."""
         
         # --- Header ---
         header = tk.Frame(self.window, bg=self.colors["bg"], pady=15)
         header.pack(fill=tk.X, padx=20)
         
-        tk.Label(header, text="⚙️ Device Configuration", 
-                font=("Helvetica", 16, "bold"), 
-                fg="white", bg=self.colors["bg"]).pack(side=tk.LEFT)
+        ttk.Label(header, text="⚙️ Device Configuration", style="Header.TLabel").pack(side=tk.LEFT)
         
         # --- Floor List Section ---
         floor_section = tk.LabelFrame(self.window, text=" Floors ", 
@@ -120,168 +416,216 @@ class DeviceConfigWindow:
         floor_btn_frame = tk.Frame(floor_section, bg=self.colors["card"])
         floor_btn_frame.pack(fill=tk.X)
         
-        btn_add_floor = tk.Button(floor_btn_frame, text="➕ Add Floor", 
-                                  bg=self.colors["accent"], fg="black",
-                                  font=("Arial", 10, "bold"), cursor="hand2",
-                                  command=self._add_floor)
+        btn_add_floor = ttk.Button(floor_btn_frame, text="➕ Add Floor", style="Accent.TButton",
+                                   cursor="hand2", command=self._add_floor)
         btn_add_floor.pack(side=tk.LEFT, padx=(0, 5))
         
-        btn_del_floor = tk.Button(floor_btn_frame, text="🗑️ Delete Floor", 
-                                  bg=self.colors["danger"], fg="white",
-                                  font=("Arial", 10, "bold"), cursor="hand2",
-                                  command=self._delete_floor)
+        btn_del_floor = ttk.Button(floor_btn_frame, text="🗑️ Delete Floor", style="Danger.TButton",
+                                   cursor="hand2", command=self._delete_floor)
         btn_del_floor.pack(side=tk.LEFT)
+    
+    def _build_footer(self):
+        """Build the footer buttons."""
+        
+        # --- Footer Buttons ---
+        self.footer = tk.Frame(self.window, bg=self.colors["bg"], pady=15)
+        self.footer.pack(fill=tk.X, padx=20)
+        
+        btn_close = ttk.Button(self.footer, text="Close", style="Large.Neutral.TButton",
+                               cursor="hand2", width=15, command=self._close)
+        btn_close.pack(side=tk.LEFT, ipady=8)
+        
+        btn_save = ttk.Button(self.footer, text="💾 Save All", style="Large.Accent.TButton",
+                              cursor="hand2", width=15, command=self._save_and_close)
+        btn_save.pack(side=tk.RIGHT, ipady=8)
+        
+        # Non-modal feedback for successes and input problems (see _flash_status)
+        self.status_var = tk.StringVar(self.window)
+        self.status_label = ttk.Label(self.footer, textvariable=self.status_var,
+                                      style="Status.TLabel", anchor="center")
+        self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=10)
+    
+    def _ensure_details_built(self):
+        """Build the Floor Details and Beacon Assignment sections once."""
+        if self._details_built:
+            return
+        self._build_details_lazy()
+        self._build_beacons_lazy()
+        self._details_built = True
+    
+    def _build_details_lazy(self):
+        """Build the Floor Details section above the footer."""
         
         # --- Floor Details Section ---
         self.details_frame = tk.LabelFrame(self.window, text=" Floor Details ", 
                                            bg=self.colors["card"], fg=self.colors["text"],
                                            font=("Helvetica", 11, "bold"), pady=15, padx=15)
-        self.details_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 10))
+        self.details_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=(0, 10),
+                                before=self.footer)
         
         # Floor Name
-        tk.Label(self.details_frame, text="Floor Name:", 
-                bg=self.colors["card"], fg=self.colors["text"],
-                font=("Helvetica", 10)).grid(row=0, column=0, sticky="w", pady=5)
+        ttk.Label(self.details_frame, text="Floor Name:",
+                  style="Card.TLabel").grid(row=0, column=0, sticky="w", pady=5)
         
-        self.entry_floor_name = tk.Entry(self.details_frame, bg=self.colors["input_bg"],
-                                         fg=self.colors["text"], font=("Consolas", 11),
-                                         insertbackground="white", width=40)
+        self.var_floor_name = tk.StringVar(self.window)
+        self.entry_floor_name = ttk.Entry(self.details_frame, style="Card.TEntry",
+                                          textvariable=self.var_floor_name,
+                                          font=("Consolas", 11), width=40)
         self.entry_floor_name.grid(row=0, column=1, sticky="ew", pady=5, padx=(10, 0))
         
         # Macro Sensor DevEUI
-        tk.Label(self.details_frame, text="Macro Sensor DevEUI:", 
-                bg=self.colors["card"], fg=self.colors["text"],
-                font=("Helvetica", 10)).grid(row=1, column=0, sticky="w", pady=5)
+        ttk.Label(self.details_frame, text="Macro Sensor DevEUI:",
+                  style="Card.TLabel").grid(row=1, column=0, sticky="w", pady=5)
         
-        self.entry_macro_sensor = tk.Entry(self.details_frame, bg=self.colors["input_bg"],
-                                           fg=self.colors["text"], font=("Consolas", 11),
-                                           insertbackground="white", width=40)
+        self.var_macro_sensor = tk.StringVar(self.window)
+        self.entry_macro_sensor = ttk.Entry(self.details_frame, style="Card.TEntry",
+                                            textvariable=self.var_macro_sensor,
+                                            font=("Consolas", 11), width=40)
         self.entry_macro_sensor.grid(row=1, column=1, sticky="ew", pady=5, padx=(10, 0))
         
-        tk.Label(self.details_frame, text="(e.g., 70b3d5a4d31205cf)", 
-                bg=self.colors["card"], fg="#666",
-                font=("Helvetica", 9)).grid(row=2, column=1, sticky="w", padx=(10, 0))
+        ttk.Label(self.details_frame, text="(e.g., 70b3d5a4d31205cf)",
+                  style="Hint.TLabel").grid(row=2, column=1, sticky="w", padx=(10, 0))
         
         # Bluetooth Gateway DevEUI
-        tk.Label(self.details_frame, text="Bluetooth Gateway DevEUI:", 
-                bg=self.colors["card"], fg=self.colors["text"],
-                font=("Helvetica", 10)).grid(row=3, column=0, sticky="w", pady=5)
+        ttk.Label(self.details_frame, text="Bluetooth Gateway DevEUI:",
+                  style="Card.TLabel").grid(row=3, column=0, sticky="w", pady=5)
         
-        self.entry_bt_gateway = tk.Entry(self.details_frame, bg=self.colors["input_bg"],
-                                         fg=self.colors["text"], font=("Consolas", 11),
-                                         insertbackground="white", width=40)
+        self.var_bt_gateway = tk.StringVar(self.window)
+        self.entry_bt_gateway = ttk.Entry(self.details_frame, style="Card.TEntry",
+                                          textvariable=self.var_bt_gateway,
+                                          font=("Consolas", 11), width=40)
         self.entry_bt_gateway.grid(row=3, column=1, sticky="ew", pady=5, padx=(10, 0))
         
-        tk.Label(self.details_frame, text="(e.g., 70b3d5a4d3120591)", 
-                bg=self.colors["card"], fg="#666",
-                font=("Helvetica", 9)).grid(row=4, column=1, sticky="w", padx=(10, 0))
+        ttk.Label(self.details_frame, text="(e.g., 70b3d5a4d3120591)",
+                  style="Hint.TLabel").grid(row=4, column=1, sticky="w", padx=(10, 0))
         
         # LoRaWAN Gateway ID
-        tk.Label(self.details_frame, text="LoRaWAN Gateway ID:", 
-                bg=self.colors["card"], fg=self.colors["text"],
-                font=("Helvetica", 10)).grid(row=5, column=0, sticky="w", pady=5)
+        ttk.Label(self.details_frame, text="LoRaWAN Gateway ID:",
+                  style="Card.TLabel").grid(row=5, column=0, sticky="w", pady=5)
         
-        self.entry_lora_gateway = tk.Entry(self.details_frame, bg=self.colors["input_bg"],
-                                           fg=self.colors["text"], font=("Consolas", 11),
-                                           insertbackground="white", width=40)
+        self.var_lora_gateway = tk.StringVar(self.window)
+        self.entry_lora_gateway = ttk.Entry(self.details_frame, style="Card.TEntry",
+                                            textvariable=self.var_lora_gateway,
+                                            font=("Consolas", 11), width=40)
         self.entry_lora_gateway.grid(row=5, column=1, sticky="ew", pady=5, padx=(10, 0))
         
-        tk.Label(self.details_frame, text="(e.g., ac1f09fffe1ea999)", 
-                bg=self.colors["card"], fg="#666",
-                font=("Helvetica", 9)).grid(row=6, column=1, sticky="w", padx=(10, 0))
+        ttk.Label(self.details_frame, text="(e.g., ac1f09fffe1ea999)",
+                  style="Hint.TLabel").grid(row=6, column=1, sticky="w", padx=(10, 0))
         
         # Update Floor button
-        btn_update = tk.Button(self.details_frame, text="✔️ Update Floor Details", 
-                               bg=self.colors["accent"], fg="black",
-                               font=("Arial", 10, "bold"), cursor="hand2",
-                               command=self._update_floor_details)
+        btn_update = ttk.Button(self.details_frame, text="✔️ Update Floor Details",
+                                style="Accent.TButton", cursor="hand2",
+                                command=self._update_floor_details)
         btn_update.grid(row=7, column=0, columnspan=2, pady=(15, 5), sticky="ew")
         
+        # Configure grid weights
+        self.details_frame.columnconfigure(1, weight=1)
+    
+    def _build_beacons_lazy(self):
+        """Build the Beacon Assignment section above the footer."""
+        
         # --- Beacon Assignment Section ---
         beacon_section = tk.LabelFrame(self.window, text=" Beacon Assignment ", 
                                        bg=self.colors["card"], fg=self.colors["text"],
                                        font=("Helvetica", 11, "bold"), pady=10, padx=10)
-        beacon_section.pack(fill=tk.X, padx=20, pady=(0, 10))
-        
-        # Beacon listbox with checkboxes (simulated with text)
-        self.beacon_listbox = tk.Listbox(beacon_section, bg=self.colors["input_bg"], 
-                                         fg=self.colors["text"], font=("Consolas", 11),
-                                         height=4, selectmode=tk.MULTIPLE,
-                                         selectbackground=self.colors["accent"],
-                                         selectforeground="black", borderwidth=0)
-        self.beacon_listbox.pack(fill=tk.X, pady=(0, 10))
+        beacon_section.pack(fill=tk.X, padx=20, pady=(0, 10), before=self.footer)
+        
+        # Beacon tree with checkboxes (simulated with text), one row per beacon id
+        self.beacon_tree = ttk.Treeview(beacon_section, columns=("assigned", "id", "name"),
+                                        show="headings", height=4, selectmode="extended",
+                                        style="Beacon.Treeview")
+        self.beacon_tree.heading("assigned", text="")
+        self.beacon_tree.heading("id", text="Beacon ID")
+        self.beacon_tree.heading("name", text="Name")
+        self.beacon_tree.column("assigned", width=30, anchor="center", stretch=False)
+        self.beacon_tree.column("id", width=100, anchor="w")
+        self.beacon_tree.column("name", width=300, anchor="w")
+        self.beacon_tree.tag_configure("on", foreground=self.colors["accent"])
+        self.beacon_tree.tag_configure("off", foreground=self.colors["text"])
+        self.beacon_tree.pack(fill=tk.X, pady=(0, 10))
+        self.beacon_tree.bind('<Button-1>', self._on_beacon_click)
+        self._beacon_rows = {}
         
         # Add beacon entry
         add_beacon_frame = tk.Frame(beacon_section, bg=self.colors["card"])
         add_beacon_frame.pack(fill=tk.X)
         
-        tk.Label(add_beacon_frame, text="New Beacon ID:", 
-                bg=self.colors["card"], fg=self.colors["text"],
-                font=("Helvetica", 10)).pack(side=tk.LEFT)
+        ttk.Label(add_beacon_frame, text="New Beacon ID:", style="Card.TLabel").pack(side=tk.LEFT)
         
-        self.entry_new_beacon = tk.Entry(add_beacon_frame, bg=self.colors["input_bg"],
-                                         fg=self.colors["text"], font=("Consolas", 11),
-                                         insertbackground="white", width=10)
+        self.entry_new_beacon = ttk.Entry(add_beacon_frame, style="Card.TEntry",
+                                          font=("Consolas", 11), width=10)
         self.entry_new_beacon.pack(side=tk.LEFT, padx=5)
         
-        tk.Label(add_beacon_frame, text="Name:", 
-                bg=self.colors["card"], fg=self.colors["text"],
-                font=("Helvetica", 10)).pack(side=tk.LEFT)
+        ttk.Label(add_beacon_frame, text="Name:", style="Card.TLabel").pack(side=tk.LEFT)
         
-        self.entry_beacon_name = tk.Entry(add_beacon_frame, bg=self.colors["input_bg"],
-                                          fg=self.colors["text"], font=("Consolas", 11),
-                                          insertbackground="white", width=15)
+        self.entry_beacon_name = ttk.Entry(add_beacon_frame, style="Card.TEntry",
+                                           font=("Consolas", 11), width=15)
         self.entry_beacon_name.pack(side=tk.LEFT, padx=5)
         
-        btn_add_beacon = tk.Button(add_beacon_frame, text="➕ Add", 
-                                   bg=self.colors["warning"], fg="black",
-                                   font=("Arial", 9, "bold"), cursor="hand2",
-                                   command=self._add_beacon)
+        btn_add_beacon = ttk.Button(add_beacon_frame, text="➕ Add", style="Small.Warning.TButton",
+                                    cursor="hand2", command=self._add_beacon)
         btn_add_beacon.pack(side=tk.LEFT, padx=5)
         
-        btn_del_beacon = tk.Button(add_beacon_frame, text="🗑️ Delete", 
-                                   bg=self.colors["danger"], fg="white",
-                                   font=("Arial", 9, "bold"), cursor="hand2",
-                                   command=self._delete_beacon)
+        btn_del_beacon = ttk.Button(add_beacon_frame, text="🗑️ Delete", style="Small.Danger.TButton",
+                                    cursor="hand2", command=self._delete_beacon)
         btn_del_beacon.pack(side=tk.LEFT)
-        
-        # --- Footer Buttons ---
-        footer = tk.Frame(self.window, bg=self.colors["bg"], pady=15)
-        footer.pack(fill=tk.X, padx=20)
-        
-        btn_cancel = tk.Button(footer, text="Cancel", 
-                               bg="#4b5563", fg="white",
-                               font=("Arial", 11, "bold"), cursor="hand2",
-                               width=15, command=self.window.destroy)
-        btn_cancel.pack(side=tk.LEFT, ipady=8)
-        
-        btn_save = tk.Button(footer, text="💾 Save All", 
-                             bg=self.colors["accent"], fg="black",
-                             font=("Arial", 11, "bold"), cursor="hand2",
-                             width=15, command=self._save_and_close)
-        btn_save.pack(side=tk.RIGHT, ipady=8)
-        
-        # Configure grid weights
-        self.details_frame.columnconfigure(1, weight=1)
     
     def _populate_floors(self):
         """Populate the floor listbox."""
+        if self._floor_labels_version == self._cfg_version:
+            return
+        
+        # One insert call for all rows instead of one Tcl round-trip per floor
+        labels = [f"📍 {floor['name']}" for floor in self.config_data.get("floors", [])]
         self.floor_listbox.delete(0, tk.END)
-        for floor in self.config_data.get("floors", []):
-            self.floor_listbox.insert(tk.END, f"📍 {floor['name']}")
+        if labels:
+            self.floor_listbox.insert(tk.END, *labels)
+        self._floor_labels_version = self._cfg_version
     
     def _populate_beacons(self):
-        """Populate beacon listbox for selected floor."""
-        self.beacon_listbox.delete(0, tk.END)
-        
-        for beacon in self.config_data.get("beacons", []):
-            assigned = beacon.get("floor_id") == self.selected_floor_id
-            icon = "☑" if assigned else "☐"
-            self.beacon_listbox.insert(tk.END, f"{icon} {beacon['id']} - {beacon.get('name', 'Unknown')}")
+        """
+        Sync the beacon tree with the config for the selected floor.
+        Rows are keyed by beacon id, so only added/removed beacons are
+        inserted/deleted and only rows whose ☑/☐ state changed are touched.
+        """
+        tree = self.beacon_tree
+        rows = self._beacon_rows
+        assigned_ids = {b["id"] for b in self._beacons_by_floor.get(self.selected_floor_id, ())}
+        
+        if self._beacon_displayed_version == self._beacon_content_version:
+            # Same beacons as on screen: only rows whose ☑/☐ flipped need touching
+            for bid in assigned_ids ^ self._shown_assigned:
+                assigned = bid in assigned_ids
+                values = ("☑" if assigned else "☐",) + rows[bid][1:]
+                tree.item(bid, values=values, tags=("on" if assigned else "off",))
+                rows[bid] = values
+        else:
+            stale = [bid for bid in rows if bid not in self._beacons_by_id]
+            if stale:
+                tree.delete(*stale)
+                for bid in stale:
+                    del rows[bid]
             
-            if assigned:
-                idx = self.beacon_listbox.size() - 1
-                self.beacon_listbox.selection_set(idx)
+            for bid, beacon in self._beacons_by_id.items():
+                assigned = bid in assigned_ids
+                values = ("☑" if assigned else "☐", bid, beacon.get("name", "Unknown"))
+                if bid not in rows:
+                    tree.insert("", tk.END, iid=bid, values=values, tags=("on" if assigned else "off",))
+                elif rows[bid] != values:
+                    tree.item(bid, values=values, tags=("on" if assigned else "off",))
+                rows[bid] = values
+            self._beacon_displayed_version = self._beacon_content_version
+        
+        self._shown_assigned = assigned_ids
+        tree.selection_set(tuple(assigned_ids))
+    
+    def _on_beacon_click(self, event):
+        """Toggle a beacon row's selection on click, so no modifier key is needed."""
+        row = self.beacon_tree.identify_row(event.y)
+        if not row:
+            return None
+        self.beacon_tree.selection_toggle(row)
+        return "break"
     
     def _on_floor_select(self, event):
         """Handle floor selection."""
@@ -294,40 +638,33 @@ class DeviceConfigWindow:
     
     def _select_floor(self, floor_id):
         """Select and display a floor's details."""
+        self._ensure_details_built()
         self.selected_floor_id = floor_id
         
-        # Find floor data
-        floor = None
-        for f in self.config_data.get("floors", []):
-            if f["id"] == floor_id:
-                floor = f
-                break
-        
+        floor = self._floors_by_id.get(floor_id)
         if not floor:
             return
         
-        # Clear and populate entries
-        self.entry_floor_name.delete(0, tk.END)
-        self.entry_floor_name.insert(0, floor.get("name", ""))
-        
-        self.entry_macro_sensor.delete(0, tk.END)
-        self.entry_macro_sensor.insert(0, floor.get("macro_sensor_eui", ""))
-        
-        self.entry_bt_gateway.delete(0, tk.END)
-        self.entry_bt_gateway.insert(0, floor.get("bluetooth_gateway_eui", ""))
-        
-        self.entry_lora_gateway.delete(0, tk.END)
-        self.entry_lora_gateway.insert(0, floor.get("lorawan_gateway_id", ""))
+        # Populate entries (one set() per bound variable)
+        self.var_floor_name.set(floor.get("name", ""))
+        self.var_macro_sensor.set(floor.get("macro_sensor_eui", ""))
+        self.var_bt_gateway.set(floor.get("bluetooth_gateway_eui", ""))
+        self.var_lora_gateway.set(floor.get("lorawan_gateway_id", ""))
         
         # Populate beacons
         self._populate_beacons()
     
     def _add_floor(self):
         """Add a new floor."""
-        # Generate unique ID
+        if not self._config_loaded:
+            return
+        
+        # Generate unique ID (a deleted floor can leave floor_<count+1> taken)
         floor_num = len(self.config_data.get("floors", [])) + 1
+        while f"floor_{floor_num}" in self._floors_by_id:
+            floor_num += 1
         new_floor = {
-            "id": f"floor_{floor_num}",
+            "id": sys.intern(f"floor_{floor_num}"),
             "name": f"Floor {floor_num}",
             "macro_sensor_eui": "70b3d5a4d31205cf",
             "bluetooth_gateway_eui": "",
@@ -338,6 +675,8 @@ class DeviceConfigWindow:
             self.config_data["floors"] = []
         
         self.config_data["floors"].append(new_floor)
+        self._floors_by_id.setdefault(new_floor["id"], new_floor)
+        self._schedule_save()
         self._populate_floors()
         
         # Select the new floor
@@ -348,108 +687,190 @@ class DeviceConfigWindow:
     def _delete_floor(self):
         """Delete selected floor."""
         if not self.selected_floor_id:
-            messagebox.showwarning("Warning", "Please select a floor to delete.")
+            self._flash_status("Please select a floor to delete.", warn=True)
             return
         
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this floor?"):
             # Remove floor
-            self.config_data["floors"] = [f for f in self.config_data.get("floors", []) 
-                                          if f["id"] != self.selected_floor_id]
+            floor = self._floors_by_id.pop(self.selected_floor_id, None)
+            if floor is not None:
+                self.config_data["floors"].remove(floor)
             
             # Unassign beacons from this floor
-            for beacon in self.config_data.get("beacons", []):
-                if beacon.get("floor_id") == self.selected_floor_id:
-                    beacon["floor_id"] = None
+            for beacon in self._beacons_by_floor.pop(self.selected_floor_id, []):
+                beacon["floor_id"] = None
             
+            self._schedule_save()
             self.selected_floor_id = None
             self._populate_floors()
             
             # Clear details
-            self.entry_floor_name.delete(0, tk.END)
-            self.entry_macro_sensor.delete(0, tk.END)
-            self.entry_bt_gateway.delete(0, tk.END)
-            self.entry_lora_gateway.delete(0, tk.END)
-            self.beacon_listbox.delete(0, tk.END)
+            self.var_floor_name.set("")
+            self.var_macro_sensor.set("")
+            self.var_bt_gateway.set("")
+            self.var_lora_gateway.set("")
+            if self._beacon_rows:
+                self.beacon_tree.delete(*self._beacon_rows)
+                self._beacon_rows.clear()
+            self._beacon_displayed_version = -1
+            self._shown_assigned = set()
     
     def _update_floor_details(self):
         """Update the selected floor's details from entries."""
         if not self.selected_floor_id:
-            messagebox.showwarning("Warning", "Please select a floor first.")
+            self._flash_status("Please select a floor first.", warn=True)
             return
         
-        # Find and update floor
-        for floor in self.config_data.get("floors", []):
-            if floor["id"] == self.selected_floor_id:
-                floor["name"] = self.entry_floor_name.get().strip()
-                floor["macro_sensor_eui"] = self.entry_macro_sensor.get().strip().lower()
-                floor["bluetooth_gateway_eui"] = self.entry_bt_gateway.get().strip().lower()
-                floor["lorawan_gateway_id"] = self.entry_lora_gateway.get().strip().lower()
-                break
+        macro_eui = self.var_macro_sensor.get().strip().lower()
+        bt_eui = self.var_bt_gateway.get().strip().lower()
+        lora_id = self.var_lora_gateway.get().strip().lower()
         
-        # Update beacon assignments based on selection
-        selected_indices = self.beacon_listbox.curselection()
-        beacons = self.config_data.get("beacons", [])
+        # Reject malformed IDs up front (blank means "not configured")
+        for label, value in (("Macro Sensor DevEUI", macro_eui),
+                             ("Bluetooth Gateway DevEUI", bt_eui),
+                             ("LoRaWAN Gateway ID", lora_id)):
+            if value and not _EUI_RE.fullmatch(value):
+                self._flash_status(f"{label} must be 16 hex digits.", warn=True)
+                return
         
-        for i, beacon in enumerate(beacons):
-            if i in selected_indices:
-                beacon["floor_id"] = self.selected_floor_id
-            elif beacon.get("floor_id") == self.selected_floor_id:
-                beacon["floor_id"] = None
+        # Only the fields that actually differ get written
+        floor = self._floors_by_id.get(self.selected_floor_id)
+        delta = {}
+        if floor:
+            new_values = {
+                "name": self.var_floor_name.get().strip(),
+                "macro_sensor_eui": macro_eui,
+                "bluetooth_gateway_eui": bt_eui,
+                "lorawan_gateway_id": lora_id
+            }
+            delta = {k: v for k, v in new_values.items() if floor.get(k, "") != v}
+        
+        selected = [self._beacons_by_id[bid] for bid in self.beacon_tree.selection()
+                    if bid in self._beacons_by_id]
+        selected_ids = {b["id"] for b in selected}
+        assigned = self._beacons_by_floor.get(self.selected_floor_id, ())
+        
+        # Nothing changed: no index updates, repopulate or save
+        if not delta and selected_ids == {b["id"] for b in assigned}:
+            self._flash_status("No changes")
+            return
         
+        if delta:
+            floor.update(delta)
+        
+        # Update beacon assignments based on selection
+        for beacon in list(assigned):
+            if beacon["id"] not in selected_ids:
+                self._assign_beacon(beacon, None)
+        for beacon in selected:
+            self._assign_beacon(beacon, self.selected_floor_id)
+        
+        self._schedule_save()
         self._populate_floors()
-        messagebox.showinfo("Success", "Floor details updated!")
+        self._flash_status("Floor details updated ✓")
     
     def _add_beacon(self):
         """Add a new beacon."""
-        beacon_id = self.entry_new_beacon.get().strip().upper()
+        beacon_id = sys.intern(self.entry_new_beacon.get().strip().upper())
         beacon_name = self.entry_beacon_name.get().strip() or f"Beacon {beacon_id}"
         
         if not beacon_id:
-            messagebox.showwarning("Warning", "Please enter a beacon ID.")
+            self._flash_status("Please enter a beacon ID.", warn=True)
             return
         
         # Check if already exists
-        for beacon in self.config_data.get("beacons", []):
-            if beacon["id"].upper() == beacon_id:
-                messagebox.showwarning("Warning", f"Beacon {beacon_id} already exists.")
-                return
+        if beacon_id in self._beacon_ids:
+            self._flash_status(f"Beacon {beacon_id} already exists.", warn=True)
+            return
         
         if "beacons" not in self.config_data:
             self.config_data["beacons"] = []
         
-        self.config_data["beacons"].append({
+        new_beacon = {
             "id": beacon_id,
             "name": beacon_name,
             "floor_id": self.selected_floor_id
-        })
+        }
+        self.config_data["beacons"].append(new_beacon)
+        self._beacons_by_id[beacon_id] = new_beacon
+        self._beacon_ids.add(beacon_id)
+        self._beacon_content_version += 1
+        if self.selected_floor_id is not None:
+            self._beacons_by_floor[self.selected_floor_id].append(new_beacon)
+        self._schedule_save()
         
         self.entry_new_beacon.delete(0, tk.END)
         self.entry_beacon_name.delete(0, tk.END)
         self._populate_beacons()
+        self._flash_status(f"Beacon {beacon_id} added ✓")
     
     def _delete_beacon(self):
         """Delete selected beacon(s)."""
-        selection = self.beacon_listbox.curselection()
+        selection = self.beacon_tree.selection()
         if not selection:
-            messagebox.showwarning("Warning", "Please select beacon(s) to delete.")
+            self._flash_status("Please select beacon(s) to delete.", warn=True)
             return
         
         if messagebox.askyesno("Confirm Delete", "Delete selected beacon(s)?"):
             beacons = self.config_data.get("beacons", [])
-            # Remove selected (in reverse order to maintain indices)
-            for idx in sorted(selection, reverse=True):
-                if idx < len(beacons):
-                    del beacons[idx]
+            for bid in selection:
+                beacon = self._beacons_by_id.pop(bid, None)
+                if beacon is not None:
+                    self._assign_beacon(beacon, None)
+                    beacons.remove(beacon)
+                    self._beacon_ids.discard(bid.upper())
+                    self._beacon_content_version += 1
             
+            self._schedule_save()
             self._populate_beacons()
+            self._flash_status(f"Deleted {len(selection)} beacon(s)")
     
     def _save_and_close(self):
         """Save configuration and close window."""
-        if self._save_config():
-            messagebox.showinfo("Success", "Configuration saved successfully!")
+        if self._flush_save(force=True, wait=True):
+            # Closing the window is the confirmation; no modal success dialog
             if self.on_save_callback:
                 self.on_save_callback()
-            self.window.destroy()
+            self._destroy()
+    
+    def _close(self):
+        """Flush any pending auto-save and close window."""
+        if not self._flush_save(wait=True):
+            return
+        if self._saved and self.on_save_callback:
+            self.on_save_callback()
+        self._destroy()
+    
+    def _flash_status(self, message, warn=False):
+        """
+        Show a transient message in the footer instead of a modal dialog.
+        
+        Args:
+            message: Text to show
+            warn: Use the warning colour and keep it up longer
+        """
+        if self._status_clear_id is not None:
+            self.window.after_cancel(self._status_clear_id)
+        self.status_label.configure(style="Warning.Status.TLabel" if warn else "Status.TLabel")
+        self.status_var.set(message)
+        self._status_clear_id = self.window.after(
+            self.WARNING_STATUS_MS if warn else self.STATUS_MS, self._clear_status)
+    
+    def _clear_status(self):
+        """Timer callback: blank the footer status message."""
+        self._status_clear_id = None
+        self.status_var.set("")
+    
+    def _destroy(self):
+        """Destroy the window, cancelling pending timers and stopping the I/O thread."""
+        if self._load_poll_id is not None:
+            self.window.after_cancel(self._load_poll_id)
+            self._load_poll_id = None
+        if self._status_clear_id is not None:
+            self.window.after_cancel(self._status_clear_id)
+            self._status_clear_id = None
+        self._io_pool.shutdown(wait=False)
+        self.window.destroy()
 
 
 def open_config_window(parent, on_save_callback=None):
@@ -1,10 +1,43 @@
 import tkinter as tk
 from tkinter import ttk
 from src.config import settings
+from src.services.decoder import get_watchlist, reload_watchlist
 from src.ui.device_config_window import open_config_window
+from functools import lru_cache
 import time
 
 
+# status -> (cell text, index into MonitorWindow._zone_counts or -1 if not
+# counted, row tag)
+_STATUS_MAP = {
+    "SAFE": ("🟢 SAFE", 0, "safe"),
+    "WEAK": ("🟡 WEAK", -1, "weak"),
+    "ALARM": ("🔴 ALARM", 1, "alarm"),
+    "LOST": ("⚫ LOST", 2, "lost"),
+}
+_DEFAULT_STATUS = ("⚪ WAITING", -1, "waiting")
+
+# Preformatted RSSI cells for the usual range; 0 means no reading yet
+_RSSI_TEXT = {rssi: f"{rssi} dBm" for rssi in range(-120, 0)}
+_RSSI_TEXT[0] = "-- dBm"
+
+# Beacon table columns: (column id, heading, width, anchor), in row-value order
+_COLUMNS = (
+    ("status", "Status", 100, "center"),
+    ("id", "Beacon ID", 100, "center"),
+    ("name", "Name", 180, "w"),
+    ("location", "Location", 150, "center"),
+    ("rssi", "RSSI", 100, "center"),
+    ("last_seen", "Last Seen", 120, "center"),
+)
+
+
+@lru_cache(maxsize=512)
+def _fmt_hms(ts):
+    """HH:MM:SS for an epoch second; last_seen values repeat across refreshes."""
+    return time.strftime('%H:%M:%S', time.localtime(ts))
+
+
 class MonitorWindow:
     """
     Multi-beacon monitoring window with Treeview display.
@@ -19,7 +52,20 @@ class MonitorWindow:
         
         self.on_manual_alarm = on_manual_alarm
         self.alarm_rules = alarm_rules
+        self.on_table_reset = None
         self.last_update = 0
+        self._zones = {}  # beacon_id -> last status shown, for the summary
+        self._zone_counts = [0, 0, 0]  # SAFE, ALARM, LOST rows, kept in step with _zones
+        self._summary_stale = True  # _zones changed since the summary was last built
+        self._row_cache = {}  # beacon_id -> row values last sent to the tree
+        self._shown_names = {}  # watchlist beacon_id -> name it was added with
+        self._last_summary = None  # (text, color) last shown in lbl_summary
+        self._mqtt_shown = None  # connected flag last shown in lbl_mqtt_status
+        
+        # False while the window is minimized; table refreshes wait until shown
+        self.visible = True
+        self.root.bind("<Unmap>", self._on_unmap, add="+")
+        self.root.bind("<Map>", self._on_map, add="+")
 
         # Color scheme
         self.colors = {
@@ -81,24 +127,19 @@ class MonitorWindow:
         table_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
         
         # Treeview
-        columns = ("status", "id", "name", "location", "rssi", "last_seen")
+        columns = tuple(spec[0] for spec in _COLUMNS)
         self.tree = ttk.Treeview(table_frame, columns=columns, show="headings", height=10)
         
-        # Column headings
-        self.tree.heading("status", text="Status")
-        self.tree.heading("id", text="Beacon ID")
-        self.tree.heading("name", text="Name")
-        self.tree.heading("location", text="Location")
-        self.tree.heading("rssi", text="RSSI")
-        self.tree.heading("last_seen", text="Last Seen")
+        # Column headings and widths
+        for cid, heading, width, anchor in _COLUMNS:
+            self.tree.heading(cid, text=heading)
+            self.tree.column(cid, width=width, anchor=anchor)
         
-        # Column widths
-        self.tree.column("status", width=100, anchor="center")
-        self.tree.column("id", width=100, anchor="center")
-        self.tree.column("name", width=180, anchor="w")
-        self.tree.column("location", width=150, anchor="center")
-        self.tree.column("rssi", width=100, anchor="center")
-        self.tree.column("last_seen", width=120, anchor="center")
+        # Row colors, configured once; rows only get a new tag when their status changes
+        for tag, color in (("safe", self.colors["safe"]), ("weak", self.colors["weak"]),
+                           ("alarm", self.colors["alarm"]), ("lost", self.colors["lost"]),
+                           ("waiting", self.colors["text"])):
+            self.tree.tag_configure(tag, foreground=color)
         
         # Scrollbar
         scrollbar = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self.tree.yview)
@@ -144,22 +185,60 @@ class MonitorWindow:
         self._init_beacon_table()
 
     def _init_beacon_table(self):
-        """Initialize table with beacons from watchlist."""
+        """Initialize table with beacons from the in-memory watchlist snapshot."""
         try:
-            watchlist = settings.load_watchlist()
+            watchlist = get_watchlist()
             for beacon_id, info in watchlist.items():
-                self.tree.insert("", tk.END, iid=beacon_id, values=(
+                values = (
                     "⚫ WAITING",
                     beacon_id,
                     info.get("name", f"Beacon {beacon_id}"),
                     "Unknown",
                     "-- dBm",
                     "Never"
-                ))
+                )
+                self.tree.insert("", tk.END, iid=beacon_id, values=values, tags=("waiting",))
+                self._row_cache[beacon_id] = values
+                self._shown_names[beacon_id] = values[2]
         except Exception as e:
             print(f"Failed to init beacon table: {e}")
 
+    def _sync_beacon_table(self, watchlist):
+        """Apply a changed watchlist: drop removed rows, add new ones, rename the rest."""
+        old_names = self._shown_names
+        new_names = {
+            beacon_id: info.get("name", f"Beacon {beacon_id}")
+            for beacon_id, info in watchlist.items()
+        }
+        
+        removed = [beacon_id for beacon_id in old_names if beacon_id not in new_names]
+        if removed:
+            self.tree.delete(*removed)
+            for beacon_id in removed:
+                self._row_cache.pop(beacon_id, None)
+                idx = _STATUS_MAP.get(self._zones.pop(beacon_id, None), _DEFAULT_STATUS)[1]
+                if idx >= 0:
+                    self._zone_counts[idx] -= 1
+        
+        for beacon_id, name in new_names.items():
+            values = self._row_cache.get(beacon_id)
+            if values is None:
+                values = ("⚫ WAITING", beacon_id, name, "Unknown", "-- dBm", "Never")
+                self.tree.insert("", tk.END, iid=beacon_id, values=values, tags=("waiting",))
+            elif values[2] != name:
+                values = values[:2] + (name,) + values[3:]
+                self.tree.item(beacon_id, values=values)
+            else:
+                continue
+            self._row_cache[beacon_id] = values
+        
+        self._shown_names = new_names
+
     def set_mqtt_connected(self, connected):
+        # Called every GUI tick; only reconfigure the label when the state flips
+        if connected == self._mqtt_shown:
+            return
+        self._mqtt_shown = connected
         if connected:
             self.lbl_mqtt_status.config(text="● MQTT: Connected", fg=self.colors["safe"])
         else:
@@ -172,13 +251,23 @@ class MonitorWindow:
         Args:
             beacon_states: List of dicts with beacon state info from AlarmRules
         """
-        self.last_update = time.time()
+        self._zones.clear()
+        self._zone_counts = [0, 0, 0]
+        self._summary_stale = True
+        self.apply_delta(beacon_states)
+
+    def apply_delta(self, changes):
+        """
+        Update only the given rows; other rows keep their last values.
         
-        safe_count = 0
-        alarm_count = 0
-        lost_count = 0
+        Args:
+            changes: List of beacon state dicts (same format as update_beacon_states)
+        """
+        self.last_update = time.time()
         
-        for state in beacon_states:
+        # Format every changed row first, then make the Tk calls back to back
+        updates = []
+        for state in changes:
             beacon_id = state.get("id", "")
             name = state.get("name", f"Beacon {beacon_id}")
             location = state.get("location", "Unknown")
@@ -186,62 +275,93 @@ class MonitorWindow:
             status = state.get("state", "UNKNOWN")
             last_seen = state.get("last_seen", 0)
             
-            # Status icon and color
-            if status == "SAFE":
-                status_text = "🟢 SAFE"
-                safe_count += 1
-            elif status == "WEAK":
-                status_text = "🟡 WEAK"
-            elif status == "ALARM":
-                status_text = "🔴 ALARM"
-                alarm_count += 1
-            elif status == "LOST":
-                status_text = "⚫ LOST"
-                lost_count += 1
-            else:
-                status_text = "⚪ WAITING"
+            # Status icon; summary counters move only when a row's status changes
+            status_text, idx, tag = _STATUS_MAP.get(status, _DEFAULT_STATUS)
+            old_status = self._zones.get(beacon_id)
+            if old_status != status:
+                old_idx = _STATUS_MAP.get(old_status, _DEFAULT_STATUS)[1]
+                if old_status is not None and old_idx >= 0:
+                    self._zone_counts[old_idx] -= 1
+                if idx >= 0:
+                    self._zone_counts[idx] += 1
+                self._zones[beacon_id] = status
+                self._summary_stale = True
             
             # Format last seen
             if last_seen > 0:
-                time_str = time.strftime('%H:%M:%S', time.localtime(last_seen))
+                time_str = _fmt_hms(int(last_seen))
             else:
                 time_str = "Never"
             
             # Format RSSI
-            rssi_text = f"{rssi} dBm" if rssi != 0 else "-- dBm"
+            rssi_text = _RSSI_TEXT.get(rssi) or f"{rssi} dBm"
             
-            # Update or insert row
+            # Queue the row update, skipping it if nothing changed
+            # (the row tag follows the status text, so retag only when that changed)
+            values = (status_text, beacon_id, name, location, rssi_text, time_str)
+            cached = self._row_cache.get(beacon_id)
+            if cached != values:
+                retag = cached is None or cached[0] != status_text
+                updates.append((beacon_id, values, tag if retag else None))
+        
+        for beacon_id, values, tag in updates:
             try:
-                if self.tree.exists(beacon_id):
-                    self.tree.item(beacon_id, values=(
-                        status_text, beacon_id, name, location, rssi_text, time_str
-                    ))
+                if beacon_id not in self._row_cache:
+                    self.tree.insert("", tk.END, iid=beacon_id, values=values, tags=(tag,))
+                elif tag is not None:
+                    self.tree.item(beacon_id, values=values, tags=(tag,))
                 else:
-                    self.tree.insert("", tk.END, iid=beacon_id, values=(
-                        status_text, beacon_id, name, location, rssi_text, time_str
-                    ))
+                    self.tree.item(beacon_id, values=values)
+                self._row_cache[beacon_id] = values
             except Exception as e:
                 print(f"Error updating beacon {beacon_id}: {e}")
         
-        # Update summary
-        total = len(beacon_states)
+        # RSSI / last-seen only changes leave the counters, and so the summary, as they were
+        if self._summary_stale:
+            self._update_summary()
+        
+        # One redraw pass for the whole batch
+        if updates:
+            self.root.update_idletasks()
+
+    def _update_summary(self):
+        """Rebuild the summary line from the per-status row counters."""
+        self._summary_stale = False
+        safe_count, alarm_count, lost_count = self._zone_counts
+        
+        total = len(self._zones)
+        colors = self.colors
         if alarm_count > 0:
             summary = f"🔴 {alarm_count} ALARM | Tracking {total} beacons"
-            self.lbl_summary.config(fg=self.colors["alarm"])
+            color = colors["alarm"]
         elif lost_count > 0:
             summary = f"⚫ {lost_count} LOST | Tracking {total} beacons"
-            self.lbl_summary.config(fg=self.colors["lost"])
+            color = colors["lost"]
         elif safe_count > 0:
             summary = f"✅ All {safe_count} beacons SAFE"
-            self.lbl_summary.config(fg=self.colors["safe"])
+            color = colors["safe"]
         else:
             summary = f"Tracking {total} beacons | Waiting for data..."
-            self.lbl_summary.config(fg=self.colors["text"])
+            color = colors["text"]
         
-        self.lbl_summary.config(text=summary)
+        if (summary, color) != self._last_summary:
+            self.lbl_summary.config(text=summary, fg=color)
+            self._last_summary = (summary, color)
+
+    def _on_unmap(self, event):
+        # Child widgets report their own Map/Unmap through the root's bindtag
+        if event.widget is self.root:
+            self.visible = False
+
+    def _on_map(self, event):
+        if event.widget is self.root:
+            self.visible = True
 
     def update_watchdog(self):
         """Called periodically to refresh beacon states."""
+        # Nothing to draw while the window is minimized
+        if not self.visible:
+            return
         if self.alarm_rules:
             states = self.alarm_rules.get_all_states()
             self.update_beacon_states(states)
@@ -262,6 +382,13 @@ class MonitorWindow:
     def _on_config_saved(self):
         """Callback when configuration is saved."""
         print("🔄 Configuration saved, refreshing...")
-        # Refresh beacon table with new configuration
-        self.tree.delete(*self.tree.get_children())
-        self._init_beacon_table()
+        # Update only the rows whose beacon was added, removed or renamed;
+        # the only point the watchlist snapshot is refreshed from disk
+        try:
+            self._sync_beacon_table(reload_watchlist())
+        except Exception as e:
+            print(f"Failed to refresh beacon table: {e}")
+        self._update_summary()
+        self.root.update_idletasks()
+        if self.on_table_reset:
+            self.on_table_reset()
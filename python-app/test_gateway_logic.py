@@ -64,3 +64,34 @@ if result3 is None:
     print("✅ Test 3 Passed")
 else:
     print("❌ Test 3 Failed")
+
+# --- Watchlist matching (src.services.decoder) ---
+# 4-char IDs are Minors and only match the beacon's last 4 hex chars;
+# longer IDs (e.g. full Major+Minor) still match anywhere in the beacon ID
+from src.services import decoder
+
+decoder._watchlist = {"64AF": {"id": "64AF"}, "001064B0": {"id": "001064B0"}}
+decoder._rebuild_matcher()
+
+result4 = decoder.is_beacon_tracked("64AF0010")
+print(f"Test 4 (Minor ID in Major only): {result4}")
+if result4 == (False, None):
+    print("✅ Test 4 Passed")
+else:
+    print("❌ Test 4 Failed")
+
+result5 = decoder.is_beacon_tracked("001064af")
+print(f"Test 5 (Minor Match): {result5}")
+if result5 == (True, "64AF"):
+    print("✅ Test 5 Passed")
+else:
+    print("❌ Test 5 Failed")
+
+result6 = decoder.is_beacon_tracked("FF001064B0")
+print(f"Test 6 (Full ID Substring Match): {result6}")
+if result6 == (True, "001064B0"):
+    print("✅ Test 6 Passed")
+else:
+    print("❌ Test 6 Failed")
+
+decoder._watchlist = None  # Reload from beacons.json on next use